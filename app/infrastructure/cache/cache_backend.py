@@ -0,0 +1,55 @@
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Self
+
+
+class ICacheBackend(ABC):
+    """Key/value store for cached read models.
+
+    Values must be JSON-serialisable, so a shared backend (e.g. Redis) can implement the same
+    interface; the in-process backend doubles as a local fake for it.
+    """
+
+    @abstractmethod
+    async def get(self: Self, key: str) -> Any | None: ...
+
+    @abstractmethod
+    async def set(self: Self, key: str, value: Any, ttl_seconds: float | None = None) -> None: ...
+
+    @abstractmethod
+    async def delete(self: Self, *keys: str) -> None: ...
+
+
+class InMemoryCacheBackend(ICacheBackend):
+    def __init__(self, max_size: int = 10_000, ttl_seconds: float = 60.0) -> None:
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, key: str) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl_seconds: float | None = None) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._entries.pop(key, None)
@@ -1,10 +1,40 @@
-from typing import Self
+from typing import Any, Self
 
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncSessionTransaction
+from sqlalchemy.orm import ORMExecuteState, Session, SessionTransaction
 
 from app.infrastructure.db.db_set import DbSet
 from app.infrastructure.models.user import UserEntity
 
+_WROTE_KEY = "wrote"
+_COMMITTED_WRITES_KEY = "committed_writes"
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session: Session, flush_context: Any) -> None:
+    session.info[_WROTE_KEY] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _do_orm_execute(state: ORMExecuteState) -> None:
+    # INSERT/UPDATE/DELETE statements, e.g. DbSet.insert_returning and update_where, bypass the flush
+    if state.is_insert or state.is_update or state.is_delete:
+        state.session.info[_WROTE_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session) -> None:
+    if session.info.pop(_WROTE_KEY, False):
+        session.info[_COMMITTED_WRITES_KEY] = True
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _after_transaction_end(session: Session, transaction: SessionTransaction) -> None:
+    # writes before a rolled back savepoint stay in the outer transaction
+    if transaction.parent is None:
+        session.info.pop(_WROTE_KEY, None)
+
 
 class DbContext:
     def __init__(self, session: AsyncSession, autosave: bool = False) -> None:
@@ -14,13 +44,21 @@ class DbContext:
         self.users = DbSet(UserEntity, session, autosave=autosave)
 
     async def __aenter__(self) -> Self:
-        self._transaction = await self.session.begin()
+        # the session begins its transaction, and checks out a connection, on the first statement
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
         if exc_type is not None:
-            await self._transaction.rollback()
+            await self.session.rollback()
         await self.session.close()
 
+    @property
+    def committed_writes(self) -> bool:
+        """Whether a transaction of this context committed inserts, updates or deletes."""
+        return self.session.info.get(_COMMITTED_WRITES_KEY, False)
+
     async def save(self) -> None:
         await self.session.commit()
+
+    def savepoint(self) -> AsyncSessionTransaction:
+        return self.session.begin_nested()
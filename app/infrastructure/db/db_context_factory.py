@@ -1,33 +1,204 @@
+import asyncio
 import logging
-from collections.abc import AsyncGenerator
+import time
+from collections.abc import AsyncGenerator, Sequence
 from contextlib import asynccontextmanager
 
-from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
 
 from app.infrastructure.db.db_context import DbContext
 from app.infrastructure.db.isolation_level import IsolationLevel
+from app.infrastructure.db.replica_router import ReplicaRouter
+from app.infrastructure.metrics.metrics import db_session_duration
+
+_AUTOCOMMIT = "AUTOCOMMIT"
+
+# isolation level, read only, autocommit
+SessionMode = tuple[IsolationLevel, bool, bool]
 
 
 class DbContextFactory:
-    def __init__(self, engine: AsyncEngine):
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        replica_router: ReplicaRouter | None = None,
+        read_engine: AsyncEngine | None = None,
+    ):
         self.engine = engine
+        self.replica_router = replica_router
+        # read_only contexts that no replica serves use this engine, e.g. the reader pool of a SQLite file
+        self.read_engine = read_engine or engine
+        self._active_contexts = 0
+        self._drained: asyncio.Event | None = None
+        # engine variants and session makers are immutable once built, so they are created up front
+        # and looked up without locking on every request
+        self._session_makers: dict[AsyncEngine, dict[SessionMode, async_sessionmaker[AsyncSession]]] = {
+            target: {
+                (level, read_only, False): self._build_session_maker(target, level, read_only)
+                for level in IsolationLevel
+                for read_only in (False, True)
+            }
+            for target in {engine, self.read_engine, *(replica_router.replicas if replica_router is not None else ())}
+        }
+
+    def get_session_maker(
+        self,
+        isolation_level: IsolationLevel,
+        engine: AsyncEngine | None = None,
+        read_only: bool = False,
+        autocommit: bool = False,
+    ) -> async_sessionmaker[AsyncSession]:
+        engine = engine or self.engine
+        session_makers = self._session_makers[engine]
+        mode = (isolation_level, read_only, autocommit)
+        session_maker = session_makers.get(mode)
+        if session_maker is None:
+            session_maker = session_makers.setdefault(
+                mode, self._build_session_maker(engine, isolation_level, read_only, autocommit)
+            )
+        return session_maker
 
     @asynccontextmanager
     async def create_db_context(
-        self, isolation_level=IsolationLevel.READ_COMMITTED, autosave: bool = False
+        self,
+        isolation_level=IsolationLevel.READ_COMMITTED,
+        autosave: bool = False,
+        read_only: bool = False,
+        autocommit: bool = False,
     ) -> AsyncGenerator[DbContext, None]:
-        logging.info(f"STANDARD SESSION CREATED. Isolation level: {isolation_level.value}")
+        """Opens a DbContext; no connection is checked out until its first statement.
 
-        new_engine = self.engine.execution_options(isolation_level=isolation_level.value)
+        ``read_only`` contexts may be served by a replica and run ``READ ONLY`` transactions on PostgreSQL.
+        With ``autocommit`` no transaction is begun at all: every statement commits on its own, which suits
+        single-statement reads. Server-side cursors (``DbSet.stream_project``) need a transaction on PostgreSQL.
+        """
+        logging.debug("STANDARD SESSION CREATED. Isolation level: %s", isolation_level.value)
 
-        async_session_maker = async_sessionmaker(bind=new_engine, expire_on_commit=False, autocommit=False)
-        async_session = async_session_maker()
-        db_context = DbContext(async_session, autosave=autosave)
-        try:
+        start = time.perf_counter()
+        replica_router = self.replica_router
+        replica: AsyncEngine | None = None
+        if read_only and replica_router is not None:
+            db_context, replica = await self._enter_replica_context(
+                replica_router, isolation_level, autosave, autocommit
+            )
+        else:
+            engine = self.read_engine if read_only else self.engine
+            db_context = DbContext(
+                self.get_session_maker(isolation_level, engine, read_only=read_only, autocommit=autocommit)(),
+                autosave=autosave,
+            )
             await db_context.__aenter__()
+
+        self._active_contexts += 1
+        try:
             yield db_context
-        except Exception as ex:
-            await db_context.__aexit__(type(ex), ex, ex.__traceback__)
+        except BaseException as ex:
+            # cancellation too, e.g. a streamed response whose client disconnected, or the connection leaks
+            if replica_router is not None and replica is not None:
+                if isinstance(ex, DBAPIError) and ex.connection_invalidated:
+                    replica_router.mark_unhealthy(replica)
+            await self._exit_db_context(db_context, ex)
             raise
         else:
-            await db_context.__aexit__(None, None, None)
+            await self._exit_db_context(db_context, None)
+        finally:
+            if replica_router is not None and replica is not None:
+                replica_router.released(replica)
+            if not read_only and replica_router is not None and db_context.committed_writes:
+                replica_router.record_write()
+            label = _AUTOCOMMIT if autocommit else isolation_level.name
+            db_session_duration.observe(time.perf_counter() - start, (label,))
+
+    async def _exit_db_context(self, db_context: DbContext, ex: BaseException | None) -> None:
+        # anyio delivers a cancellation again at every await inside a cancelled scope, so the rollback and close
+        # run in their own task and finish even if this await is cancelled
+        await asyncio.shield(self._close_db_context(db_context, ex))
+
+    async def _close_db_context(self, db_context: DbContext, ex: BaseException | None) -> None:
+        try:
+            if ex is None:
+                await db_context.__aexit__(None, None, None)
+            else:
+                await db_context.__aexit__(type(ex), ex, ex.__traceback__)
+        finally:
+            # counted only once the session is closed, so drain() waits for the connection to be returned
+            self._context_closed()
+
+    @property
+    def active_contexts(self) -> int:
+        return self._active_contexts
+
+    async def drain(self, timeout: float) -> int:
+        """Waits up to ``timeout`` seconds for open DbContexts to close; returns how many are still open."""
+        if self._active_contexts:
+            self._drained = asyncio.Event()
+            try:
+                await asyncio.wait_for(self._drained.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                self._drained = None
+        return self._active_contexts
+
+    def _context_closed(self) -> None:
+        self._active_contexts -= 1
+        if self._active_contexts == 0 and self._drained is not None:
+            self._drained.set()
+
+    async def _enter_replica_context(
+        self, replica_router: ReplicaRouter, isolation_level: IsolationLevel, autosave: bool, autocommit: bool
+    ) -> tuple[DbContext, AsyncEngine | None]:
+        replica = replica_router.choose()
+        while replica is not None:
+            session_maker = self.get_session_maker(isolation_level, replica, read_only=True, autocommit=autocommit)
+            db_context = DbContext(session_maker(), autosave=autosave)
+            try:
+                await db_context.__aenter__()
+                # connect up front, so an unreachable replica is replaced before the caller runs any query
+                await db_context.session.connection()
+            except (DBAPIError, OSError) as ex:
+                await db_context.__aexit__(type(ex), ex, ex.__traceback__)
+                replica_router.mark_unhealthy(replica)
+                replica = replica_router.choose()
+                continue
+            replica_router.acquired(replica)
+            return db_context, replica
+
+        session_maker = self.get_session_maker(isolation_level, self.read_engine, read_only=True, autocommit=autocommit)
+        db_context = DbContext(session_maker(), autosave=autosave)
+        await db_context.__aenter__()
+        return db_context, None
+
+    def _build_session_maker(
+        self, engine: AsyncEngine, isolation_level: IsolationLevel, read_only: bool = False, autocommit: bool = False
+    ) -> async_sessionmaker[AsyncSession]:
+        options: dict[str, object] = {}
+        if autocommit and _AUTOCOMMIT in self._get_isolation_level_values(engine):
+            options["isolation_level"] = _AUTOCOMMIT
+        else:
+            options["isolation_level"] = self._get_supported_isolation_level(engine, isolation_level)
+            if read_only and engine.dialect.name == "postgresql":
+                # begins with BEGIN ... READ ONLY, so there is no extra SET TRANSACTION round trip
+                options["postgresql_readonly"] = True
+        return async_sessionmaker(bind=engine.execution_options(**options), expire_on_commit=False, autocommit=False)
+
+    @staticmethod
+    def _get_isolation_level_values(engine: AsyncEngine) -> Sequence[str]:
+        try:
+            return engine.dialect.get_isolation_level_values(None)
+        except Exception:
+            return ()
+
+    @classmethod
+    def _get_supported_isolation_level(cls, engine: AsyncEngine, isolation_level: IsolationLevel) -> str:
+        supported = cls._get_isolation_level_values(engine)
+        if not supported:
+            return isolation_level.value
+
+        # some dialects (e.g. SQLite) only offer a few levels; a stricter level is always a valid substitute
+        levels = list(IsolationLevel)
+        for candidate in levels[levels.index(isolation_level):]:
+            if candidate.value in supported:
+                return candidate.value
+        return isolation_level.value
@@ -1,9 +1,11 @@
-from typing import Generic, Sequence, Type, TypeVar
+from typing import Any, AsyncIterator, Generic, Sequence, Type, TypeVar
 
-from sqlalchemy import Result, and_, or_
+from sqlalchemy import Delete, Result, Row, Select, Update, delete, func, insert, inspect, or_, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
+from app.infrastructure.db.entity_changes import entity_change_notifier
+
 T = TypeVar("T")
 
 
@@ -27,6 +29,21 @@ class DbSet(Generic[T]):
         await self.__autosave()
         return entities
 
+    async def insert_returning(self, values: dict[str, Any], columns: Sequence[Any]) -> Row:
+        """Inserts one row with a single ``INSERT ... RETURNING`` and returns the requested columns.
+
+        Nothing is added to the session, so there is no flush and no refresh query afterwards.
+        ``columns`` must include the primary key when the entity type is tracked by the change notifier.
+        """
+        statement = insert(self.entity_type).values(values).returning(*columns)
+        row = (await self.session.execute(statement)).one()
+        if entity_change_notifier.is_tracked(self.entity_type):
+            # core statements bypass the mapper events the notifier listens to
+            identity = tuple(row._mapping[column] for column in inspect(self.entity_type).primary_key)
+            entity_change_notifier.record(self.session.sync_session, self.entity_type, [identity])
+        await self.__autosave()
+        return row
+
     async def try_get(self, entity_id: int) -> T | None:
         return await self.session.get(self.entity_type, entity_id)
 
@@ -46,6 +63,61 @@ class DbSet(Generic[T]):
         result = await self.__search_by_criteria(*criteria, or_conditions=or_conditions)
         return result.scalars().all()
 
+    async def project(
+        self,
+        columns: Sequence[Any],
+        *criteria,
+        or_conditions: list | tuple | None = None,
+        order_by: Any | None = None,
+        limit: int | None = None,
+    ) -> Sequence[Row]:
+        # plain rows of the requested columns; nothing is hydrated into entities or tracked by the session
+        statement = self.__project(columns, *criteria, or_conditions=or_conditions, order_by=order_by)
+        if limit is not None:
+            statement = statement.limit(limit)
+        result = await self.session.execute(statement)
+        return result.all()
+
+    async def try_project_first(
+        self, columns: Sequence[Any], *criteria, or_conditions: list | tuple | None = None
+    ) -> Row | None:
+        result = await self.session.execute(
+            self.__project(columns, *criteria, or_conditions=or_conditions).limit(1)
+        )
+        return result.first()
+
+    async def summarize(
+        self,
+        columns: Sequence[Any],
+        *criteria,
+        or_conditions: list | tuple | None = None,
+        order_by: Any | None = None,
+        limit: int | None = None,
+    ) -> Row:
+        """Returns the row count and the sum of each column over the rows ``project`` would return.
+
+        Only the aggregates are sent back, as a single row.
+        """
+        rows = self.__project(columns, *criteria, or_conditions=or_conditions, order_by=order_by)
+        if limit is not None:
+            rows = rows.limit(limit)
+        rows = rows.subquery()
+        result = await self.session.execute(select(func.count(), *(func.coalesce(func.sum(c), 0) for c in rows.c)))
+        return result.one()
+
+    async def stream_project(
+        self,
+        columns: Sequence[Any],
+        *criteria,
+        or_conditions: list | tuple | None = None,
+        order_by: Any | None = None,
+        yield_per: int = 1000,
+    ) -> AsyncIterator[Row]:
+        statement = self.__project(columns, *criteria, or_conditions=or_conditions, order_by=order_by)
+        result = await self.session.stream(statement.execution_options(yield_per=yield_per))
+        async for row in result:
+            yield row
+
     async def update(self, entity: T) -> T:
         self.session.add(entity)
         await self.__autosave_and_refresh(entity)
@@ -66,6 +138,27 @@ class DbSet(Generic[T]):
             await self.session.delete(entity)
         await self.__autosave()
 
+    async def update_where(
+        self,
+        *criteria,
+        values: dict[str, Any],
+        or_conditions: list | tuple | None = None,
+        return_ids: bool = False,
+    ) -> int | list[Any]:
+        mapper = inspect(self.entity_type)
+        if mapper.version_id_col is not None:
+            # the mapper only counts versions for updates it flushes itself
+            version = getattr(self.entity_type, mapper.get_property_by_column(mapper.version_id_col).key)
+            values = {version.key: version + 1, **values}
+        statement = update(self.entity_type).where(*self.__conditions(*criteria, or_conditions=or_conditions))
+        return await self.__execute_bulk(statement.values(values), return_ids)
+
+    async def delete_where(
+        self, *criteria, or_conditions: list | tuple | None = None, return_ids: bool = False
+    ) -> int | list[Any]:
+        statement = delete(self.entity_type).where(*self.__conditions(*criteria, or_conditions=or_conditions))
+        return await self.__execute_bulk(statement, return_ids)
+
     async def refresh(self, entity: T) -> T:
         await self.session.refresh(entity)
         return entity
@@ -74,14 +167,47 @@ class DbSet(Generic[T]):
         await self.session.commit()
 
     async def __search_by_criteria(self, *criteria, or_conditions: list | tuple | None = None) -> Result[tuple[T]]:
-        and_condition = and_(*criteria)
-        or_condition = or_(*or_conditions) if or_conditions else None
-        if or_condition is not None:
-            final_condition = and_(and_condition, or_condition)
-        else:
-            final_condition = and_condition
-
-        return await self.session.execute(select(self.entity_type).filter(final_condition))
+        return await self.session.execute(self.__select(*criteria, or_conditions=or_conditions))
+
+    def __select(self, *criteria, or_conditions: list | tuple | None = None) -> Select[tuple[T]]:
+        return select(self.entity_type).filter(*self.__conditions(*criteria, or_conditions=or_conditions))
+
+    def __project(
+        self, columns: Sequence[Any], *criteria, or_conditions: list | tuple | None = None, order_by: Any | None = None
+    ) -> Select:
+        statement = select(*columns).select_from(self.entity_type)
+        statement = statement.filter(*self.__conditions(*criteria, or_conditions=or_conditions))
+        if order_by is not None:
+            statement = statement.order_by(order_by)
+        return statement
+
+    @staticmethod
+    def __conditions(*criteria, or_conditions: list | tuple | None = None) -> list:
+        conditions = list(criteria)
+        if or_conditions:
+            conditions.append(or_(*or_conditions))
+        return conditions
+
+    async def __execute_bulk(self, statement: Update | Delete, return_ids: bool) -> int | list[Any]:
+        # single UPDATE/DELETE ... WHERE; synchronize_session keeps already loaded entities in step with the rows
+        track_changes = entity_change_notifier.is_tracked(self.entity_type)
+        if return_ids or track_changes:
+            statement = statement.returning(*inspect(self.entity_type).primary_key)
+
+        result = await self.session.execute(statement, execution_options={"synchronize_session": "auto"})
+        if not (return_ids or track_changes):
+            await self.__autosave()
+            return result.rowcount  # type: ignore
+
+        identities = [tuple(row) for row in result.all()]
+        if track_changes:
+            # bulk statements bypass the mapper events the notifier listens to
+            entity_change_notifier.record(self.session.sync_session, self.entity_type, identities)
+        await self.__autosave()
+
+        if return_ids:
+            return [identity[0] if len(identity) == 1 else identity for identity in identities]
+        return len(identities)
 
     async def __autosave(self) -> None:
         if self.autosave:
@@ -0,0 +1,95 @@
+import asyncio
+from dataclasses import dataclass, fields, replace
+from typing import Any, Literal, Self
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+
+from app.infrastructure.metrics.sqlalchemy_metrics import (
+    InstrumentedAsyncAdaptedQueuePool,
+    instrument_engine,
+    instrument_pool,
+)
+
+
+@dataclass(frozen=True)
+class PoolOptions:
+    # "null" opens a connection per checkout, for deployments behind an external pooler such as PgBouncer
+    pool: Literal["queue", "null"] = "queue"
+    size: int = 5
+    max_overflow: int = 10
+    timeout: float = 30.0
+    recycle: int = -1
+    pre_ping: bool = False
+
+    @property
+    def capacity(self) -> int:
+        return 0 if self.pool == "null" else self.size + max(self.max_overflow, 0)
+
+    @classmethod
+    def for_url(cls, database_url: str, **overrides: Any) -> Self:
+        """Driver defaults for ``database_url`` with every override that is not None applied on top."""
+        defaults = _DRIVER_DEFAULTS.get(make_url(database_url).get_driver_name(), cls())
+        names = {field.name for field in fields(cls)}
+        return replace(
+            defaults, **{name: value for name, value in overrides.items() if name in names and value is not None}
+        )
+
+
+# asyncpg connections are slow to open and get dropped by servers and proxies while idle, so more of them
+# are kept, recycled and pinged; SQLite connections are cheap local file handles
+_DRIVER_DEFAULTS: dict[str, PoolOptions] = {
+    "aiosqlite": PoolOptions(size=5, max_overflow=10),
+    "asyncpg": PoolOptions(size=10, max_overflow=10, recycle=1800, pre_ping=True),
+}
+
+
+def create_engine(
+    database_url: str,
+    pool_options: PoolOptions,
+    echo: bool = False,
+    instrumented: bool = False,
+    pool_gauges: bool = True,
+) -> AsyncEngine:
+    url = make_url(database_url)
+    kwargs: dict[str, Any] = {"echo": echo, "pool_pre_ping": pool_options.pre_ping}
+
+    if pool_options.pool == "null":
+        kwargs["poolclass"] = NullPool
+    elif url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        # an in-memory database lives in its single connection, so the dialect's StaticPool is kept
+        pass
+    else:
+        kwargs.update(
+            poolclass=InstrumentedAsyncAdaptedQueuePool if instrumented else AsyncAdaptedQueuePool,
+            pool_size=pool_options.size,
+            max_overflow=pool_options.max_overflow,
+            pool_timeout=pool_options.timeout,
+            pool_recycle=pool_options.recycle,
+        )
+
+    engine = create_async_engine(url, **kwargs)
+    if instrumented:
+        instrument_engine(engine)
+        if pool_gauges and "pool_size" in kwargs and pool_options.capacity > 0:
+            instrument_pool(engine, pool_options.capacity)
+    return engine
+
+
+async def warm_up_pool(engine: AsyncEngine, connections: int) -> int:
+    """Opens ``connections`` pooled connections at once and returns them, so the pool keeps them idle."""
+    pool = engine.sync_engine.pool
+    if isinstance(pool, QueuePool):
+        # connections above pool_size are overflow and would be closed again on checkin
+        connections = min(connections, pool.size())
+    pending = [engine.connect() for _ in range(connections)]
+    results = await asyncio.gather(*(connection.start() for connection in pending), return_exceptions=True)
+
+    opened = [result for result in results if isinstance(result, AsyncConnection)]
+    await asyncio.gather(*(connection.close() for connection in opened))
+
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return len(opened)
@@ -0,0 +1,68 @@
+import asyncio
+import inspect
+from typing import Any, Awaitable, Callable, Type
+
+from sqlalchemy import event
+from sqlalchemy.orm import Mapper, Session, SessionTransaction, object_session
+
+_CHANGES_KEY = "entity_changes"
+
+EntityChangeCallback = Callable[[list[tuple[Any, ...]]], Awaitable[None] | None]
+
+
+class EntityChangeNotifier:
+    """Publishes the primary keys of inserted, updated and deleted entities once their transaction commits.
+
+    Only entity types with at least one subscriber are tracked. Async callbacks are scheduled on the
+    running event loop, since SQLAlchemy commit events are synchronous.
+    """
+
+    def __init__(self) -> None:
+        self._subscribers: dict[Type, list[EntityChangeCallback]] = {}
+        self._background_tasks: set[asyncio.Task] = set()
+        event.listen(Session, "after_commit", self._after_commit)
+        event.listen(Session, "after_transaction_end", self._after_transaction_end)
+
+    def subscribe(self, entity_type: Type, callback: EntityChangeCallback) -> None:
+        if entity_type not in self._subscribers:
+            self._subscribers[entity_type] = []
+            for event_name in ("after_insert", "after_update", "after_delete"):
+                event.listen(entity_type, event_name, self._record_change)
+        self._subscribers[entity_type].append(callback)
+
+    def is_tracked(self, entity_type: Type) -> bool:
+        return entity_type in self._subscribers
+
+    def record(self, session: Session, entity_type: Type, identities: list[tuple[Any, ...]]) -> None:
+        session.info.setdefault(_CHANGES_KEY, set()).update((entity_type, identity) for identity in identities)
+
+    def _record_change(self, mapper: Mapper, connection: Any, target: Any) -> None:
+        session = object_session(target)
+        if session is not None:
+            self.record(session, mapper.class_, [tuple(mapper.primary_key_from_instance(target))])
+
+    def _after_commit(self, session: Session) -> None:
+        changes = session.info.pop(_CHANGES_KEY, None)
+        if not changes:
+            return
+
+        by_type: dict[Type, list[tuple[Any, ...]]] = {}
+        for entity_type, identity in changes:
+            by_type.setdefault(entity_type, []).append(identity)
+
+        for entity_type, identities in by_type.items():
+            for callback in self._subscribers.get(entity_type, []):
+                result = callback(identities)
+                if inspect.isawaitable(result):
+                    task = asyncio.ensure_future(result)
+                    self._background_tasks.add(task)
+                    task.add_done_callback(self._background_tasks.discard)
+
+    def _after_transaction_end(self, session: Session, transaction: SessionTransaction) -> None:
+        # a rolled back savepoint leaves the changes made before it in the outer transaction, so only the end
+        # of the root transaction drops them; after a commit they were already published by _after_commit
+        if transaction.parent is None:
+            session.info.pop(_CHANGES_KEY, None)
+
+
+entity_change_notifier = EntityChangeNotifier()
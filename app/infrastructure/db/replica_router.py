@@ -0,0 +1,113 @@
+import itertools
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Literal, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+@dataclass
+class ReadConsistency:
+    # identifies the client (e.g. the token subject) so its later requests to this worker also see its writes
+    client_key: str | None = None
+    # wall-clock time of the client's last write as the client reports it, so any worker knows about it
+    last_write_at: float | None = None
+    wrote: bool = False
+
+
+# per-request state for read-your-writes stickiness, set by the request pipeline; None outside of a request
+current_read_consistency: ContextVar[ReadConsistency | None] = ContextVar("current_read_consistency", default=None)
+
+ReplicaStrategy = Literal["round_robin", "least_connections"]
+
+
+class ReplicaRouter:
+    """Chooses the replica engine for read-only DbContexts.
+
+    Replicas that fail are skipped for ``retry_seconds``. After a write, reads of the same request
+    and of the same client go to the primary for ``sticky_seconds`` so they see their own writes
+    despite replication lag. The router only remembers the writes made through its own process;
+    other workers learn about them from ``ReadConsistency.last_write_at``.
+    """
+
+    def __init__(
+        self,
+        replicas: Sequence[AsyncEngine],
+        strategy: ReplicaStrategy = "round_robin",
+        sticky_seconds: float = 5.0,
+        retry_seconds: float = 30.0,
+    ) -> None:
+        self.replicas = list(replicas)
+        self.strategy = strategy
+        self.sticky_seconds = sticky_seconds
+        self.retry_seconds = retry_seconds
+        self._next = itertools.cycle(range(len(self.replicas)))
+        self._active = [0] * len(self.replicas)
+        self._unhealthy_until = [0.0] * len(self.replicas)
+        self._last_writes: dict[str, float] = {}
+
+    def healthy_count(self) -> int:
+        now = time.monotonic()
+        return sum(1 for until in self._unhealthy_until if until <= now)
+
+    def choose(self) -> AsyncEngine | None:
+        """Returns the replica to read from, or None if the read has to go to the primary."""
+        if not self.replicas or self.must_read_primary():
+            return None
+
+        now = time.monotonic()
+        healthy = [index for index, until in enumerate(self._unhealthy_until) if until <= now]
+        if not healthy:
+            return None
+
+        if self.strategy == "least_connections":
+            index = min(healthy, key=self._active.__getitem__)
+        else:
+            for _ in range(len(self.replicas)):
+                index = next(self._next)
+                if index in healthy:
+                    break
+        return self.replicas[index]
+
+    def acquired(self, replica: AsyncEngine) -> None:
+        self._active[self.replicas.index(replica)] += 1
+
+    def released(self, replica: AsyncEngine) -> None:
+        self._active[self.replicas.index(replica)] -= 1
+
+    def mark_unhealthy(self, replica: AsyncEngine) -> None:
+        index = self.replicas.index(replica)
+        if self._unhealthy_until[index] <= time.monotonic():
+            logging.warning("Replica %s failed, reading from other engines for %ss", replica.url, self.retry_seconds)
+        self._unhealthy_until[index] = time.monotonic() + self.retry_seconds
+
+    def record_write(self) -> None:
+        consistency = current_read_consistency.get()
+        if consistency is None or self.sticky_seconds <= 0:
+            return
+        consistency.wrote = True
+
+        if consistency.client_key is not None:
+            now = time.monotonic()
+            self._last_writes[consistency.client_key] = now
+            if len(self._last_writes) > 10_000:
+                self._last_writes = {
+                    key: written for key, written in self._last_writes.items() if now - written < self.sticky_seconds
+                }
+
+    def must_read_primary(self) -> bool:
+        consistency = current_read_consistency.get()
+        if consistency is None or self.sticky_seconds <= 0:
+            return False
+        if consistency.wrote:
+            return True
+        # the client could send any time, but it only decides where its own reads go
+        if consistency.last_write_at is not None and time.time() - consistency.last_write_at < self.sticky_seconds:
+            return True
+
+        if consistency.client_key is None:
+            return False
+        written = self._last_writes.get(consistency.client_key)
+        return written is not None and time.monotonic() - written < self.sticky_seconds
@@ -0,0 +1,77 @@
+from dataclasses import dataclass
+from typing import Any
+
+from sqlalchemy import Connection, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.infrastructure.db.engine import PoolOptions, create_engine
+
+
+@dataclass(frozen=True)
+class SqliteOptions:
+    journal_mode: str = "wal"
+    # with WAL, NORMAL syncs at checkpoints instead of on every commit; a power loss can only drop the last commits
+    synchronous: str = "normal"
+    mmap_size: int = 256 * 1024 * 1024
+    cache_size_kib: int = 64 * 1024
+    busy_timeout_ms: int = 5000
+
+
+def is_sqlite_file(database_url: str) -> bool:
+    url = make_url(database_url)
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+
+def apply_pragmas(engine: AsyncEngine, options: SqliteOptions, query_only: bool = False) -> None:
+    """Sets the pragmas on every new connection of ``engine``."""
+    pragmas = [
+        f"journal_mode={options.journal_mode}",
+        f"synchronous={options.synchronous}",
+        f"mmap_size={options.mmap_size}",
+        # negative sizes are KiB rather than pages
+        f"cache_size=-{options.cache_size_kib}",
+        f"busy_timeout={options.busy_timeout_ms}",
+    ]
+    if query_only:
+        pragmas.append("query_only=ON")
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_pragmas(dbapi_connection: Any, connection_record: Any) -> None:
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(f"PRAGMA {pragma}")
+        cursor.close()
+
+
+def begin_immediate(engine: AsyncEngine) -> None:
+    """Starts every transaction on ``engine`` with ``BEGIN IMMEDIATE``, so it takes the write lock up front.
+
+    A deferred transaction that reads first and writes later fails with "database is locked" right away
+    when another connection writes in between; ``BEGIN IMMEDIATE`` waits for ``busy_timeout`` instead.
+    """
+
+    @event.listens_for(engine.sync_engine, "begin")
+    def _begin_immediate(connection: Connection) -> None:
+        if connection.get_execution_options().get("isolation_level") != "AUTOCOMMIT":
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def create_sqlite_engines(
+    database_url: str,
+    pool_options: PoolOptions,
+    options: SqliteOptions,
+    echo: bool = False,
+    instrumented: bool = False,
+) -> tuple[AsyncEngine, AsyncEngine]:
+    """Returns a writer engine whose transactions begin immediately and a read-only engine.
+
+    In WAL mode the readers never block the writer or each other, so only write transactions queue
+    for the database's single write lock.
+    """
+    writer = create_engine(database_url, pool_options, echo, instrumented)
+    reader = create_engine(database_url, pool_options, echo, instrumented, pool_gauges=False)
+    apply_pragmas(writer, options)
+    apply_pragmas(reader, options, query_only=True)
+    begin_immediate(writer)
+    return writer, reader
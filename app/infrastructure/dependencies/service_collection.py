@@ -1,9 +1,10 @@
 # type: ignore
 
+import asyncio
 import inspect
-import threading
+from contextvars import ContextVar
 from functools import wraps
-from typing import Any, Callable, Dict, Type, TypeVar, Union
+from typing import Any, Callable, Dict, List, Set, Tuple, Type, TypeVar, Union
 
 from fastapi import Request
 
@@ -43,51 +44,206 @@ class ServiceProvider:
     def __init__(self, services: Dict[Type, Dict[str, Any]], singletons: Dict[Type, Any]):
         self._services = services
         self._singletons = singletons
-        self._scopes = threading.local()
+        # each asyncio task (and thread) sees its own current scope, so concurrent requests never share one
+        self._current_scope: ContextVar['ServiceScope | None'] = ContextVar('current_scope', default=None)
+
+        # compiled resolution plans: service type -> function building a new instance / returning the cached one
+        self._dependencies: Dict[Type, List[Tuple[str, Type]]] = {}
+        self._async_services: Set[Type] = set()
+        self._creators: Dict[Type, Callable[[], Any]] = {}
+        self._resolvers: Dict[Type, Callable[[], Any]] = {}
+        self._compile()
 
     def create_scope(self) -> 'ServiceScope':
-        scope = ServiceScope(self)
-        if not hasattr(self._scopes, 'current'):
-            self._scopes.current = []
-        self._scopes.current.append(scope)
+        scope = ServiceScope(self, self._current_scope.get())
+        self._current_scope.set(scope)
         return scope
 
+    def is_async(self, service_type: Type) -> bool:
+        return service_type in self._async_services
+
     async def get_service(self, service_type: Type[T]) -> T:
-        if service_type not in self._services:
+        resolver = self._resolvers.get(service_type)
+        if resolver is None:
             raise Exception(f"Service of type {service_type} is not registered")
+        if service_type in self._async_services:
+            return await resolver()
+        return resolver()
 
+    def get_service_sync(self, service_type: Type[T]) -> T:
+        resolver = self._resolvers.get(service_type)
+        if resolver is None:
+            raise Exception(f"Service of type {service_type} is not registered")
+        if service_type in self._async_services:
+            raise Exception(f"Service of type {service_type} has an async factory in its dependency graph")
+        return resolver()
+
+    async def initialize_singletons(self) -> int:
+        """Creates every singleton that does not exist yet, e.g. before traffic is accepted; returns how many."""
+        created = 0
+        for service_type, service_info in self._services.items():
+            if service_info['lifetime'] == 'singleton' and service_type not in self._singletons:
+                await self.get_service(service_type)
+                created += 1
+        return created
+
+    def _get_current_scope(self) -> 'ServiceScope | None':
+        return self._current_scope.get()
+
+    def _compile(self) -> None:
+        for service_type, service_info in self._services.items():
+            self._dependencies[service_type] = self._get_dependencies(service_info['implementation'])
+
+        ordered = self._validate()
+        for service_type in ordered:
+            self._compile_service(service_type)
+
+    def _get_dependencies(self, implementation: Any) -> List[Tuple[str, Type]]:
+        if not inspect.isclass(implementation):
+            return []
+
+        dependencies = []
+        for param in inspect.signature(implementation.__init__).parameters.values():
+            if param.name == 'self' or param.annotation == param.empty:
+                continue
+            if param.kind in (param.VAR_POSITIONAL, param.VAR_KEYWORD):
+                continue
+            if param.default != param.empty and param.annotation not in self._services:
+                continue
+            dependencies.append((param.name, param.annotation))
+        return dependencies
+
+    def _validate(self) -> List[Type]:
+        """Checks the dependency graph and returns the services ordered so dependencies come first."""
+        ordered: List[Type] = []
+        visited: Set[Type] = set()
+        # services that are scoped themselves or (transitively) need a scoped service
+        scope_bound: Set[Type] = set()
+
+        def visit(service_type: Type, path: List[Type]) -> None:
+            if service_type in visited:
+                return
+            if service_type in path:
+                cycle = path[path.index(service_type):] + [service_type]
+                raise Exception("Circular dependency detected: " + " -> ".join(t.__name__ for t in cycle))
+
+            lifetime = self._services[service_type]['lifetime']
+            for _, dependency_type in self._dependencies[service_type]:
+                if dependency_type not in self._services:
+                    raise Exception(f"Service {service_type} depends on {dependency_type}, which is not registered")
+                visit(dependency_type, path + [service_type])
+                if dependency_type in scope_bound:
+                    if lifetime == 'singleton':
+                        raise Exception(
+                            f"Singleton service {service_type} cannot depend on {dependency_type}, "
+                            + "which requires a scope"
+                        )
+                    scope_bound.add(service_type)
+
+            if lifetime == 'scoped':
+                scope_bound.add(service_type)
+            visited.add(service_type)
+            ordered.append(service_type)
+
+        for service_type in self._services:
+            visit(service_type, [])
+        return ordered
+
+    def _compile_service(self, service_type: Type) -> None:
         service_info = self._services[service_type]
-        if service_info['lifetime'] == 'singleton':
-            if service_type not in self._singletons:
-                self._singletons[service_type] = await self._create_implementation(service_info['implementation'])
-            return self._singletons[service_type]
-        elif service_info['lifetime'] == 'scoped':
-            current_scope = self._get_current_scope()
-            if current_scope is None:
-                raise Exception("No active scope found for scoped service")
-            return await current_scope.get_service(service_type)
-
-        return await self._create_implementation(service_info['implementation'])
-
-    async def _create_implementation(self, implementation: Union[Type[T], Callable[[], T], T]) -> T:
-        if callable(implementation):
-            if inspect.isclass(implementation):
-                constructor = inspect.signature(implementation.__init__)
-                dependencies = {param.name: await self.get_service(param.annotation)
-                                for param in constructor.parameters.values()
-                                if param.name != 'self' and param.annotation != param.empty}
-                return implementation(**dependencies)
+        implementation = service_info['implementation']
+        lifetime = service_info['lifetime']
+
+        if not callable(implementation):
+            # a ready instance never needs to be built
+            self._singletons.setdefault(service_type, implementation)
+            creator = lambda: implementation  # noqa: E731
+            is_async = False
+        else:
+            dependencies = [
+                (name, dependency_type in self._async_services, self._resolvers[dependency_type])
+                for name, dependency_type in self._dependencies[service_type]
+            ]
+            is_coroutine = inspect.iscoroutinefunction(implementation)
+            is_async = is_coroutine or any(dependency_is_async for _, dependency_is_async, _ in dependencies)
+            if is_async:
+                creator = self._build_async_creator(implementation, dependencies, is_coroutine)
+            elif dependencies:
+                creator = self._build_sync_creator(implementation, dependencies)
             else:
-                if inspect.iscoroutinefunction(implementation):
-                    return await implementation()
-                else:
-                    return implementation()
-        return implementation
+                creator = implementation
+
+        if is_async:
+            self._async_services.add(service_type)
+        self._creators[service_type] = creator
+
+        if lifetime == 'singleton':
+            self._resolvers[service_type] = self._build_singleton_resolver(service_type, creator, is_async)
+        elif lifetime == 'scoped':
+            self._resolvers[service_type] = self._build_scoped_resolver(service_type, is_async)
+        else:
+            self._resolvers[service_type] = creator
+
+    @staticmethod
+    def _build_sync_creator(implementation: Callable, dependencies: List[Tuple[str, bool, Callable]]) -> Callable:
+        resolvers = [(name, resolver) for name, _, resolver in dependencies]
+
+        def create() -> Any:
+            return implementation(**{name: resolver() for name, resolver in resolvers})
+
+        return create
+
+    @staticmethod
+    def _build_async_creator(
+        implementation: Callable, dependencies: List[Tuple[str, bool, Callable]], is_coroutine: bool
+    ) -> Callable:
+        async def create() -> Any:
+            kwargs = {}
+            for name, dependency_is_async, resolver in dependencies:
+                kwargs[name] = await resolver() if dependency_is_async else resolver()
+            if is_coroutine:
+                return await implementation(**kwargs)
+            return implementation(**kwargs)
+
+        return create
+
+    def _build_singleton_resolver(self, service_type: Type, creator: Callable, is_async: bool) -> Callable:
+        singletons = self._singletons
+
+        if is_async:
+            async def resolve_async() -> Any:
+                if service_type in singletons:
+                    return singletons[service_type]
+                return singletons.setdefault(service_type, await creator())
+
+            return resolve_async
+
+        def resolve() -> Any:
+            if service_type in singletons:
+                return singletons[service_type]
+            return singletons.setdefault(service_type, creator())
+
+        return resolve
+
+    def _build_scoped_resolver(self, service_type: Type, is_async: bool) -> Callable:
+        current_scope = self._current_scope
+
+        def get_scope() -> 'ServiceScope':
+            scope = current_scope.get()
+            if scope is None:
+                raise Exception("No active scope found for scoped service")
+            return scope
+
+        if is_async:
+            async def resolve_async() -> Any:
+                return await get_scope().get_service(service_type)
+
+            return resolve_async
+
+        def resolve() -> Any:
+            return get_scope().get_service_sync(service_type)
 
-    def _get_current_scope(self) -> 'ServiceScope':
-        if not hasattr(self._scopes, 'current') or not self._scopes.current:
-            return None
-        return self._scopes.current[-1]
+        return resolve
 
     def injector(self) -> Callable:
         def decorator(func_or_class: Any) -> Any:
@@ -142,26 +298,58 @@ class ServiceProvider:
 
 
 class ServiceScope:
-    def __init__(self, service_provider: ServiceProvider):
+    def __init__(self, service_provider: ServiceProvider, parent: 'ServiceScope | None' = None):
         self._service_provider = service_provider
+        self._parent = parent
         self._scoped_services: Dict[Type, Any] = {}
 
-    def get_service(self, service_type: Type[T]) -> T:
-        if service_type not in self._scoped_services:
-            service_info = self._service_provider._services[service_type]
-            if service_info['lifetime'] == 'scoped':
-                implementation = self._service_provider._create_implementation(service_info['implementation'])
-                self._scoped_services[service_type] = implementation
-                return implementation
-        return self._scoped_services[service_type]
-
-    def dispose(self) -> None:
-        for service in self._scoped_services.values():
+    async def __aenter__(self) -> 'ServiceScope':
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.dispose()
+
+    async def get_service(self, service_type: Type[T]) -> T:
+        if service_type in self._scoped_services:
+            return self._scoped_services[service_type]
+
+        provider = self._service_provider
+        if provider._services[service_type]['lifetime'] != 'scoped':
+            return await provider.get_service(service_type)
+        if not provider.is_async(service_type):
+            return self.get_service_sync(service_type)
+
+        implementation = await provider._creators[service_type]()
+        # another coroutine of the same request may have created the service while this one was awaiting
+        return self._scoped_services.setdefault(service_type, implementation)
+
+    def get_service_sync(self, service_type: Type[T]) -> T:
+        if service_type in self._scoped_services:
+            return self._scoped_services[service_type]
+
+        provider = self._service_provider
+        if provider._services[service_type]['lifetime'] != 'scoped':
+            return provider.get_service_sync(service_type)
+        return self._scoped_services.setdefault(service_type, provider._creators[service_type]())
+
+    async def dispose(self) -> None:
+        errors = []
+        # dispose in reverse creation order, so services go away before the services they depend on
+        for service in reversed(list(self._scoped_services.values())):
             if hasattr(service, 'dispose'):
-                service.dispose()
+                try:
+                    result = service.dispose()
+                    if inspect.isawaitable(result):
+                        await result
+                except Exception as ex:
+                    errors.append(ex)
         self._scoped_services.clear()
-        if hasattr(self._service_provider._scopes, 'current'):
-            self._service_provider._scopes.current.pop()
+
+        if self._service_provider._current_scope.get() is self:
+            self._service_provider._current_scope.set(self._parent)
+
+        if errors:
+            raise errors[0]
 
 
 if __name__ == "__main__":
@@ -206,31 +394,21 @@ if __name__ == "__main__":
     service_provider = service_collection.build_service_provider()
 
     @service_provider.injector()
-    def some_function(service: IService, scoped_service: IScopedService) -> None:
+    async def some_function(service: IService, scoped_service: IScopedService) -> None:
         service.do_something()
         scoped_service.do_scoped_work()
 
     @service_provider.injector()
-    def another_function(service_b: ConcreteServiceB) -> None:
+    async def another_function(service_b: ConcreteServiceB) -> None:
         service_b.do_something_else()
 
-    @service_provider.injector()
-    class SomeClass:
-        def __init__(self, service: IService, scoped_service: IScopedService) -> None:
-            self.service = service
-            self.scoped_service = scoped_service
+    async def main() -> None:
+        # Create a new scope; it is disposed when the block exits
+        async with service_provider.create_scope():
+            await some_function()  # This should print "Service A doing something" and "Doing scoped work"
+            # This should print "Service B doing something else" and "Service A doing something"
+            await another_function()
+            await some_function()  # The scoped service is reused, so it is not created again
+        # This should print "ConcreteScopedService disposed"
 
-        def method(self) -> None:
-            self.service.do_something()
-            self.scoped_service.do_scoped_work()
-
-    # Create a new scope
-    scope = service_provider.create_scope()
-    try:
-        some_function()  # This should print "Service A doing something" and "Doing scoped work"
-        another_function()  # This should print "Service B doing something else" and "Service A doing something"
-
-        some_class_instance = SomeClass()
-        some_class_instance.method()  # This should print "Service A doing something" and "Doing scoped work"
-    finally:
-        scope.dispose()  # This should print "ConcreteScopedService disposed"
+    asyncio.run(main())
@@ -0,0 +1,242 @@
+import math
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Iterable, Self
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FAST_LATENCY_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _format_labels(label_names: tuple[str, ...], label_values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(label_names, label_values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric(ABC):
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, label_names: Iterable[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._render_samples())
+        return lines
+
+    @abstractmethod
+    def _render_samples(self: Self) -> list[str]: ...
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Iterable[str] = ()) -> None:
+        super().__init__(name, documentation, label_names)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, labels: tuple[str, ...] = ()) -> None:
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def _render_samples(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+            for labels, value in self._values.items()
+        ]
+
+
+class Gauge(Metric):
+    """Gauge whose value is read from a callback at scrape time, so nothing is recorded on the hot path."""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], float]) -> None:
+        super().__init__(name, documentation)
+        self.callback = callback
+
+    def _render_samples(self) -> list[str]:
+        return [f"{self.name} {_format_value(self.callback())}"]
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Iterable[str] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [bucket counts..., +Inf count], sum
+        self._series: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, labels: tuple[str, ...] = ()) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series.setdefault(labels, ([0] * (len(self.buckets) + 1), [0.0]))
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1][0] += value
+
+    def _render_samples(self) -> list[str]:
+        lines = []
+        for labels, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                bucket_labels = _format_labels(self.label_names, labels, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            sample_labels = _format_labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{sample_labels} {_format_value(total[0])}")
+            lines.append(f"{self.name}_count{sample_labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = {}
+
+    def counter(self, name: str, documentation: str, label_names: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, label_names))  # type: ignore
+
+    def gauge(self, name: str, documentation: str, callback: Callable[[], float]) -> Gauge:
+        return self._register(Gauge(name, documentation, callback))  # type: ignore
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Iterable[str] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, label_names, buckets))  # type: ignore
+
+    def unregister(self, name: str) -> None:
+        self._metrics.pop(name, None)
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict[str, dict]:
+        """The current samples by metric name, in a JSON-serializable form ``render_merged`` can combine."""
+        return {
+            metric.name: {
+                "help": metric.documentation,
+                "type": metric.type_name,
+                "samples": dict(line.rsplit(" ", 1) for line in metric._render_samples()),
+            }
+            for metric in self._metrics.values()
+        }
+
+    def _register(self, metric: Metric) -> Metric:
+        # re-registering replaces the previous metric, e.g. when a component is rebuilt
+        self._metrics[metric.name] = metric
+        return metric
+
+
+def _with_label(sample: str, name: str, value: str) -> str:
+    if sample.endswith("}"):
+        return f'{sample[:-1]},{name}="{_escape(value)}"}}'
+    return f'{sample}{{{name}="{_escape(value)}"}}'
+
+
+def render_merged(snapshots: Iterable[tuple[str, dict[str, dict], bool]]) -> str:
+    """Renders the snapshots of several workers, given as (worker, snapshot, live), as one exposition.
+
+    Counter and histogram samples are summed. Gauges are reported per worker with a ``worker`` label, and only for
+    live workers, since the value of an exited worker no longer describes anything.
+    """
+    merged: dict[str, tuple[str, str, dict[str, float]]] = {}
+    for worker, snapshot, live in snapshots:
+        for name, metric in snapshot.items():
+            _, type_name, samples = merged.setdefault(name, (metric["help"], metric["type"], {}))
+            for sample, value in metric["samples"].items():
+                if type_name == "gauge":
+                    if not live:
+                        continue
+                    sample = _with_label(sample, "worker", worker)
+                samples[sample] = samples.get(sample, 0.0) + float(value)
+
+    lines: list[str] = []
+    for name, (documentation, type_name, samples) in merged.items():
+        lines += [f"# HELP {name} {documentation}", f"# TYPE {name} {type_name}"]
+        lines += [f"{sample} {_format_value(value)}" for sample, value in samples.items()]
+    return "\n".join(lines) + "\n"
+
+
+class RequestStats:
+    __slots__ = ("db_statements", "db_seconds")
+
+    def __init__(self) -> None:
+        self.db_statements = 0
+        self.db_seconds = 0.0
+
+
+metrics = MetricsRegistry()
+
+# per-request accumulator, set by the metrics middleware; None outside of a request
+current_request_stats: ContextVar[RequestStats | None] = ContextVar("current_request_stats", default=None)
+
+http_request_duration = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status")
+)
+http_request_db_statements = metrics.histogram(
+    "http_request_db_statements", "SQL statements executed per HTTP request", ("method", "route"), COUNT_BUCKETS
+)
+http_request_db_duration = metrics.histogram(
+    "http_request_db_duration_seconds", "Time spent executing SQL per HTTP request", ("method", "route")
+)
+db_statement_duration = metrics.histogram("db_statement_duration_seconds", "SQL statement execution time")
+db_session_duration = metrics.histogram(
+    "db_session_duration_seconds", "Lifetime of DbContext sessions by isolation level", ("isolation_level",)
+)
+token_verification_duration = metrics.histogram(
+    "token_verification_duration_seconds", "Time spent in verify_token", ("cached",), FAST_LATENCY_BUCKETS
+)
+password_hashing_wait_duration = metrics.histogram(
+    "password_hashing_wait_seconds", "Time bcrypt operations waited for a worker", ("operation",)
+)
+password_hashing_compute_duration = metrics.histogram(
+    "password_hashing_compute_seconds", "Time bcrypt operations spent computing", ("operation",)
+)
+password_hashing_rejected = metrics.counter(
+    "password_hashing_rejected_total", "bcrypt operations rejected because the queue was full"
+)
+di_resolve_duration = metrics.histogram(
+    "di_resolve_duration_seconds", "Time spent resolving request dependencies", ("service",), FAST_LATENCY_BUCKETS
+)
+db_pool_checkout_wait = metrics.histogram(
+    "db_pool_checkout_wait_seconds", "Time spent acquiring a connection from the pool"
+)
+db_pool_checkout_timeouts = metrics.counter(
+    "db_pool_checkout_timeouts_total", "Connection checkouts that gave up after pool_timeout"
+)
+batch_loader_size = metrics.histogram(
+    "batch_loader_batch_size", "Keys loaded per batched query", ("loader",), COUNT_BUCKETS
+)
+batch_loader_wait = metrics.histogram(
+    "batch_loader_wait_seconds", "Time the first key of a batch waited for the batch to be dispatched", ("loader",)
+)
+batch_loader_duration = metrics.histogram(
+    "batch_loader_duration_seconds", "Execution time of batched queries", ("loader",)
+)
@@ -0,0 +1,83 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from pathlib import Path
+
+from app.infrastructure.metrics.metrics import MetricsRegistry, render_merged
+
+SNAPSHOT_SUFFIX = ".json"
+
+
+class MetricsDirectory:
+    """Shares the metrics of all worker processes through snapshot files in one directory.
+
+    Every worker writes its samples to ``<path>/<pid>-<start time>.json`` every ``flush_interval_seconds``, and a
+    scrape of any worker merges all snapshots with ``render_merged``. Snapshots of exited workers are kept, so totals
+    do not drop when gunicorn recycles a worker, but their gauges are left out once the snapshot is older than three
+    flush intervals. The directory is emptied when the server starts (see ``clear``), otherwise the previous run
+    would be added to the new one.
+    """
+
+    def __init__(self, registry: MetricsRegistry, path: str, flush_interval_seconds: float = 5.0) -> None:
+        self.registry = registry
+        self.path = Path(path)
+        self.flush_interval_seconds = flush_interval_seconds
+        self.worker = str(os.getpid())
+        # the start time keeps a recycled pid from overwriting the snapshot of an exited worker
+        self.name = f"{self.worker}-{time.time_ns()}"
+
+    @staticmethod
+    def clear(path: str) -> None:
+        directory = Path(path)
+        directory.mkdir(parents=True, exist_ok=True)
+        for snapshot in directory.glob(f"*{SNAPSHOT_SUFFIX}"):
+            snapshot.unlink(missing_ok=True)
+
+    async def run(self) -> None:
+        """Writes a snapshot every ``flush_interval_seconds`` until cancelled, then a final one."""
+        flush: asyncio.Future[None] | None = None
+        try:
+            while True:
+                flush = asyncio.ensure_future(self.flush())
+                await asyncio.shield(flush)
+                await asyncio.sleep(self.flush_interval_seconds)
+        finally:
+            # a cancelled flush keeps writing in its thread, and must not overwrite the final snapshot
+            if flush is not None:
+                await asyncio.gather(flush, return_exceptions=True)
+            self.write(self.registry.snapshot())
+
+    async def flush(self) -> None:
+        try:
+            # the snapshot is taken on the event loop, the registry is not shared with other threads
+            await asyncio.to_thread(self.write, self.registry.snapshot())
+        except OSError:
+            logging.exception("Could not write the metrics snapshot to %s", self.path)
+
+    async def render(self) -> str:
+        return await asyncio.to_thread(self._render, self.registry.snapshot())
+
+    def write(self, snapshot: dict[str, dict]) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        target = self.path / f"{self.name}{SNAPSHOT_SUFFIX}"
+        # written aside and renamed, so a concurrent scrape never reads a partial snapshot
+        temporary = target.with_suffix(".tmp")
+        temporary.write_text(json.dumps(snapshot))
+        os.replace(temporary, target)
+
+    def _render(self, own: dict[str, dict]) -> str:
+        snapshots = [(self.worker, own, True)]
+        now = time.time()
+        for file in self.path.glob(f"*{SNAPSHOT_SUFFIX}"):
+            name = file.name.removesuffix(SNAPSHOT_SUFFIX)
+            if name == self.name:
+                continue
+            try:
+                snapshot = json.loads(file.read_text())
+                live = now - file.stat().st_mtime <= 3 * self.flush_interval_seconds
+            except (OSError, ValueError):
+                continue
+            snapshots.append((name.split("-", 1)[0], snapshot, live))
+        return render_merged(snapshots)
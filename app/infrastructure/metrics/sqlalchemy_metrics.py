@@ -0,0 +1,59 @@
+import time
+from typing import Any
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry, QueuePool
+
+from app.infrastructure.metrics.metrics import (
+    current_request_stats,
+    db_pool_checkout_timeouts,
+    db_pool_checkout_wait,
+    db_statement_duration,
+    metrics,
+)
+
+
+def _before_cursor_execute(conn: Connection, *args: Any) -> None:
+    conn.info.setdefault("statement_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn: Connection, *args: Any) -> None:
+    duration = time.perf_counter() - conn.info["statement_start"].pop()
+    db_statement_duration.observe(duration)
+    stats = current_request_stats.get()
+    if stats is not None:
+        stats.db_statements += 1
+        stats.db_seconds += duration
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class InstrumentedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    # pool events only fire once a connection is handed out, so the wait is measured around _do_get
+    def _do_get(self) -> ConnectionPoolEntry:
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            db_pool_checkout_timeouts.inc()
+            raise
+        finally:
+            db_pool_checkout_wait.observe(time.perf_counter() - start)
+
+
+def instrument_pool(engine: AsyncEngine, capacity: int) -> None:
+    # engine.pool is looked up on every scrape because dispose() replaces it
+    def checked_out() -> float:
+        pool = engine.pool
+        return pool.checkedout() if isinstance(pool, QueuePool) else 0
+
+    metrics.gauge("db_pool_checked_out", "Connections currently checked out of the pool", checked_out)
+    metrics.gauge("db_pool_capacity", "pool_size + max_overflow", lambda: capacity)
+    metrics.gauge(
+        "db_pool_saturation", "Checked out connections as a share of pool capacity", lambda: checked_out() / capacity
+    )
@@ -1,3 +1,4 @@
+from sqlalchemy import Index
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.infrastructure.security.password_manager import IPasswordManager
@@ -7,6 +8,12 @@ from .base import Base
 
 class UserEntity(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # answers version lookups and page versions without reading the rows
+        Index("ix_users_id_version", "id", "version"),
+        # SQLite would otherwise reuse the id of a deleted last row, and an id and version must name one row state
+        {"sqlite_autoincrement": True},
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     username: Mapped[str] = mapped_column(unique=True, index=True, nullable=False)
@@ -14,15 +21,20 @@ class UserEntity(Base):
     hashed_password: Mapped[str] = mapped_column(nullable=False)
     is_active: Mapped[bool] = mapped_column(default=True)
     is_superuser: Mapped[bool] = mapped_column(default=False)
+    # incremented by every update, see DbSet.update_where for bulk updates
+    version: Mapped[int] = mapped_column(nullable=False, server_default="1")
+
+    __mapper_args__ = {"version_id_col": version}
 
     def __init__(
             self, 
             username: str, 
             email: str, 
-            password: str,
-            password_manager: IPasswordManager,
+            password: str | None = None,
+            password_manager: IPasswordManager | None = None,
             is_active: bool = True, 
             is_superuser: bool=False,
+            hashed_password: str | None = None,
         ) -> None:
         super().__init__()
         self.username = username
@@ -30,4 +42,8 @@ class UserEntity(Base):
         self.is_active = is_active
         self.is_superuser = is_superuser
         self.password_manager = password_manager
-        self.hashed_password = self.password_manager.hash_password(password=password)
+        if hashed_password is None:
+            if password is None or password_manager is None:
+                raise ValueError("Either hashed_password or password and password_manager must be provided")
+            hashed_password = password_manager.hash_password(password=password)
+        self.hashed_password = hashed_password
@@ -1,8 +1,41 @@
+import asyncio
+import time
 from abc import ABC, abstractmethod
-from typing import Self
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Literal, Self, Sequence, TypeVar
 
 import bcrypt
 
+from app.infrastructure.metrics.metrics import (
+    password_hashing_compute_duration,
+    password_hashing_rejected,
+    password_hashing_wait_duration,
+)
+
+T = TypeVar("T")
+
+
+class PasswordManagerOverloadedError(Exception):
+    pass
+
+
+@dataclass
+class PasswordHashingStats:
+    completed: int = 0
+    rejected: int = 0
+    wait_seconds_total: float = 0.0
+    wait_seconds_max: float = 0.0
+    compute_seconds_total: float = 0.0
+    compute_seconds_max: float = 0.0
+
+    def record(self, wait_seconds: float, compute_seconds: float) -> None:
+        self.completed += 1
+        self.wait_seconds_total += wait_seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, wait_seconds)
+        self.compute_seconds_total += compute_seconds
+        self.compute_seconds_max = max(self.compute_seconds_max, compute_seconds)
+
 
 class IPasswordManager(ABC):
     @abstractmethod
@@ -11,14 +44,113 @@ class IPasswordManager(ABC):
     @abstractmethod
     def verify_password(self: Self, plain_password: str, hashed_password: bytes) -> bool: ...
 
+    @abstractmethod
+    async def hash_password_async(self: Self, password: str) -> str: ...
+
+    @abstractmethod
+    async def verify_password_async(self: Self, plain_password: str, hashed_password: bytes) -> bool: ...
+
+    @abstractmethod
+    async def hash_passwords_async(self: Self, passwords: Sequence[str]) -> list[str]: ...
+
+
+def _hash_password(password: str) -> str:
+    pwd_bytes = password.encode("utf-8")
+    salt = bcrypt.gensalt()
+    hashed_password = bcrypt.hashpw(password=pwd_bytes, salt=salt)
+    return str(hashed_password)
+
+
+def _verify_password(plain_password: str, hashed_password: bytes) -> bool:
+    password_byte_enc = plain_password.encode("utf-8")
+    return bcrypt.checkpw(password=password_byte_enc, hashed_password=hashed_password)
+
+
+def _timed(func: Callable[..., T], *args: object) -> tuple[T, float]:
+    # runs inside the worker, so the measured time excludes queueing and (for processes) pickling
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
 
 class PasswordManager(IPasswordManager):
+    """Hashes passwords with bcrypt.
+
+    The async methods run bcrypt on a lazily created thread or process pool. At most
+    ``max_workers + max_queue_size`` operations may be pending; further calls fail fast
+    with ``PasswordManagerOverloadedError`` instead of queueing without bound.
+    """
+
+    def __init__(
+        self,
+        executor_type: Literal["thread", "process"] = "thread",
+        max_workers: int = 4,
+        max_queue_size: int = 64,
+    ) -> None:
+        self.executor_type = executor_type
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self.stats = PasswordHashingStats()
+        self._executor: Executor | None = None
+        self._in_flight = 0
+        # shared by all bulk calls: together they hold at most max_workers slots, so at least the queue
+        # (or one slot, without a queue) stays free for interactive calls
+        self._bulk_slots = asyncio.Semaphore(max(1, min(max_workers, max_workers + max_queue_size - 1)))
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
     def hash_password(self, password: str) -> str:
-        pwd_bytes = password.encode("utf-8")
-        salt = bcrypt.gensalt()
-        hashed_password = bcrypt.hashpw(password=pwd_bytes, salt=salt)
-        return str(hashed_password)
+        return _hash_password(password)
 
     def verify_password(self, plain_password: str, hashed_password: bytes) -> bool:
-        password_byte_enc = plain_password.encode("utf-8")
-        return bcrypt.checkpw(password=password_byte_enc, hashed_password=hashed_password)
+        return _verify_password(plain_password, hashed_password)
+
+    async def hash_password_async(self, password: str) -> str:
+        return await self._run(_hash_password, password)
+
+    async def verify_password_async(self, plain_password: str, hashed_password: bytes) -> bool:
+        return await self._run(_verify_password, plain_password, hashed_password)
+
+    async def hash_passwords_async(self, passwords: Sequence[str]) -> list[str]:
+        # bulk hashing waits for a free slot instead of failing fast
+        async def hash_one(password: str) -> str:
+            async with self._bulk_slots:
+                return await self._run(_hash_password, password, reject_when_full=False)
+
+        return list(await asyncio.gather(*(hash_one(password) for password in passwords)))
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+    async def _run(self, func: Callable[..., T], *args: object, reject_when_full: bool = True) -> T:
+        if reject_when_full and self._in_flight >= self.max_workers + self.max_queue_size:
+            self.stats.rejected += 1
+            password_hashing_rejected.inc()
+            raise PasswordManagerOverloadedError("Password hashing queue is full")
+
+        self._in_flight += 1
+        try:
+            submitted = time.perf_counter()
+            result, compute_seconds = await asyncio.get_running_loop().run_in_executor(
+                self._get_executor(), _timed, func, *args
+            )
+            wait_seconds = max(time.perf_counter() - submitted - compute_seconds, 0.0)
+            self.stats.record(wait_seconds, compute_seconds)
+            labels = (func.__name__.strip("_"),)
+            password_hashing_wait_duration.observe(wait_seconds, labels)
+            password_hashing_compute_duration.observe(compute_seconds, labels)
+            return result
+        finally:
+            self._in_flight -= 1
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bcrypt")
+        return self._executor
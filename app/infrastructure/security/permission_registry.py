@@ -0,0 +1,33 @@
+from typing import Iterable
+
+
+class PermissionRegistry:
+    """Gives every permission a route requires its own bit, so a set of permissions is a single int.
+
+    Only registered permissions have bits: a token permission that no route requires cannot grant
+    anything, so ``mask`` leaves it out instead of growing the registry.
+    """
+
+    def __init__(self) -> None:
+        self._bits: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._bits)
+
+    def register(self, permissions: Iterable[str]) -> int:
+        mask = 0
+        for permission in permissions:
+            bit = self._bits.get(permission)
+            if bit is None:
+                bit = self._bits[permission] = 1 << len(self._bits)
+            mask |= bit
+        return mask
+
+    def mask(self, permissions: Iterable[str]) -> int:
+        mask = 0
+        for permission in permissions:
+            mask |= self._bits.get(permission, 0)
+        return mask
+
+    def names(self, mask: int) -> list[str]:
+        return [permission for permission, bit in self._bits.items() if mask & bit]
@@ -0,0 +1,51 @@
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+
+class VerifiedToken(NamedTuple):
+    claims: dict[str, object]
+    # the token's permissions as a PermissionRegistry mask
+    permission_mask: int = 0
+
+
+class TokenClaimsCache:
+    """LRU cache of decoded token claims.
+
+    Entries live for at most ``ttl_seconds`` and never past the token's own ``exp`` claim.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 300.0) -> None:
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, VerifiedToken]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, token: str) -> VerifiedToken | None:
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+
+        expires_at, verified = entry
+        if expires_at <= time.time():
+            del self._entries[token]
+            return None
+
+        self._entries.move_to_end(token)
+        return verified
+
+    def set(self, token: str, verified: VerifiedToken) -> None:
+        expires_at = time.time() + self.ttl_seconds
+        exp = verified.claims.get("exp")
+        if isinstance(exp, (int, float)):
+            expires_at = min(expires_at, exp)
+
+        self._entries[token] = (expires_at, verified)
+        self._entries.move_to_end(token)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
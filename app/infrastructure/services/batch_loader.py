@@ -0,0 +1,114 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Generic, Hashable, Mapping, TypeVar
+
+from app.infrastructure.metrics.metrics import batch_loader_duration, batch_loader_size, batch_loader_wait
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+@dataclass
+class BatchLoaderStats:
+    batches: int = 0
+    keys: int = 0
+    max_batch_size: int = 0
+    wait_seconds_total: float = 0.0
+    duration_seconds_total: float = 0.0
+    duration_seconds_max: float = 0.0
+
+    @property
+    def average_batch_size(self) -> float:
+        return self.keys / self.batches if self.batches else 0.0
+
+    def record(self, batch_size: int, wait_seconds: float, duration_seconds: float) -> None:
+        self.batches += 1
+        self.keys += batch_size
+        self.max_batch_size = max(self.max_batch_size, batch_size)
+        self.wait_seconds_total += wait_seconds
+        self.duration_seconds_total += duration_seconds
+        self.duration_seconds_max = max(self.duration_seconds_max, duration_seconds)
+
+
+class BatchLoader(Generic[K, V]):
+    """Coalesces concurrent ``load`` calls into one ``batch_fn`` call.
+
+    Keys requested before the batch is dispatched (within the same event loop iteration, or within
+    ``window_seconds`` of the first key) are loaded together; a full batch is dispatched right away.
+    Missing keys resolve to None.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        batch_fn: Callable[[list[K]], Awaitable[Mapping[K, V]]],
+        window_seconds: float = 0.0,
+        max_batch_size: int = 100,
+    ) -> None:
+        self.name = name
+        self.batch_fn = batch_fn
+        self.window_seconds = window_seconds
+        self.max_batch_size = max_batch_size
+        self.stats = BatchLoaderStats()
+        self._queue: dict[K, asyncio.Future[V | None]] = {}
+        self._queued_at = 0.0
+        self._dispatch_handle: asyncio.Handle | None = None
+        # running batches, referenced so they are not garbage collected before they finish
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    async def load(self, key: K) -> V | None:
+        future = self._queue.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            # waiters re-raise the batch error; this keeps asyncio from warning when all of them were cancelled
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+            if not self._queue:
+                self._queued_at = time.perf_counter()
+            self._queue[key] = future
+
+            if len(self._queue) >= self.max_batch_size:
+                self._dispatch()
+            elif self._dispatch_handle is None:
+                if self.window_seconds > 0:
+                    self._dispatch_handle = loop.call_later(self.window_seconds, self._dispatch)
+                else:
+                    self._dispatch_handle = loop.call_soon(self._dispatch)
+
+        # a cancelled caller must not cancel the lookup for the others in the batch
+        return await asyncio.shield(future)
+
+    def _dispatch(self) -> None:
+        if self._dispatch_handle is not None:
+            self._dispatch_handle.cancel()
+            self._dispatch_handle = None
+
+        batch, self._queue = self._queue, {}
+        task = asyncio.get_running_loop().create_task(self._run(batch, self._queued_at))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: dict[K, asyncio.Future[V | None]], queued_at: float) -> None:
+        start = time.perf_counter()
+        labels = (self.name,)
+        try:
+            results = await self.batch_fn(list(batch))
+        except Exception as ex:
+            for future in batch.values():
+                future.set_exception(ex)
+            return
+        except BaseException:
+            for future in batch.values():
+                future.cancel()
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            wait = start - queued_at
+            self.stats.record(len(batch), wait, duration)
+            batch_loader_size.observe(len(batch), labels)
+            batch_loader_wait.observe(wait, labels)
+            batch_loader_duration.observe(duration, labels)
+
+        for key, future in batch.items():
+            future.set_result(results.get(key))
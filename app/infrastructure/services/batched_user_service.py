@@ -0,0 +1,35 @@
+from typing import Sequence
+
+from app.infrastructure.db.db_context_factory import DbContextFactory
+from app.infrastructure.db.replica_router import current_read_consistency
+from app.infrastructure.services.batch_loader import BatchLoader
+from app.infrastructure.services.user_service import UserService, UserSummary
+
+
+class BatchedUserService(UserService):
+    """UserService whose ``read_user_summary`` lookups are batched across concurrent requests.
+
+    Waiting callers hold no connection: each batch runs in one read-only DbContext of its own, and a
+    context per caller is only opened when it has to read its own writes from the primary.
+    """
+
+    def __init__(
+        self, db_context_factory: DbContextFactory, window_seconds: float = 0.0, max_batch_size: int = 100
+    ) -> None:
+        super().__init__()
+        self.db_context_factory = db_context_factory
+        self.loader: BatchLoader[int, UserSummary] = BatchLoader(
+            "user", self._load_user_summaries, window_seconds, max_batch_size
+        )
+
+    async def read_user_summary(self, user_id: int, db_context_factory: DbContextFactory) -> UserSummary | None:
+        replica_router = db_context_factory.replica_router
+        if replica_router is not None and replica_router.must_read_primary():
+            return await super().read_user_summary(user_id, db_context_factory)
+        return await self.loader.load(user_id)
+
+    async def _load_user_summaries(self, user_ids: Sequence[int]) -> dict[int, UserSummary]:
+        # the batch serves several requests, so none of their read-your-writes state applies to it
+        current_read_consistency.set(None)
+        async with self.db_context_factory.create_db_context(read_only=True, autocommit=True) as db_context:
+            return await self.get_user_summaries(user_ids, db_context)
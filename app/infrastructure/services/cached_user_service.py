@@ -0,0 +1,127 @@
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Sequence
+
+from app.infrastructure.cache.cache_backend import ICacheBackend
+from app.infrastructure.db.db_context import DbContext
+from app.infrastructure.db.db_context_factory import DbContextFactory
+from app.infrastructure.db.entity_changes import entity_change_notifier
+from app.infrastructure.models.user import UserEntity
+from app.infrastructure.services.user_service import (
+    IUserService,
+    UserService,
+    UserSummary,
+    UsersPageVersion,
+)
+
+
+class CachedUserService(IUserService):
+    """Read-through cache around ``UserService.get_user_summary`` and ``read_user_summary``.
+
+    Concurrent misses for the same id share a single query. Entries are invalidated whenever a
+    committed transaction inserts, updates or deletes a user.
+    """
+
+    def __init__(self, user_service: UserService, cache: ICacheBackend) -> None:
+        self.user_service = user_service
+        self.cache = cache
+        self._pending: dict[int, asyncio.Future[dict[str, Any] | None]] = {}
+        self._stale: set[int] = set()
+        entity_change_notifier.subscribe(UserEntity, self._on_users_changed)
+
+    async def create_user(self, user: UserEntity, db_context: DbContext) -> UserSummary:
+        created = await self.user_service.create_user(user, db_context)
+        await self.invalidate(created.id)
+        return created
+
+    async def import_users(self, users: Sequence[UserEntity], db_context: DbContext) -> list[str | None]:
+        # new rows cannot be cached yet; the change notifier covers anything else
+        return await self.user_service.import_users(users, db_context)
+
+    async def get_user(self, user_id: int, db_context: DbContext) -> UserEntity | None:
+        return await self.user_service.get_user(user_id, db_context)
+
+    async def get_user_summary(self, user_id: int, db_context: DbContext) -> UserSummary | None:
+        return await self._get_user_summary(user_id, lambda: self.user_service.get_user_summary(user_id, db_context))
+
+    async def read_user_summary(self, user_id: int, db_context_factory: DbContextFactory) -> UserSummary | None:
+        return await self._get_user_summary(
+            user_id, lambda: self.user_service.read_user_summary(user_id, db_context_factory)
+        )
+
+    async def _get_user_summary(
+        self, user_id: int, load: Callable[[], Awaitable[UserSummary | None]]
+    ) -> UserSummary | None:
+        while True:
+            cached = await self.cache.get(self._key(user_id))
+            if cached is not None:
+                return UserSummary(**cached)
+
+            pending = self._pending.get(user_id)
+            if pending is None:
+                break
+            try:
+                data = await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # the leader was cancelled (e.g. its client disconnected), not this request: take over the lookup
+                if pending.cancelled():
+                    continue
+                raise
+            return UserSummary(**data) if data is not None else None
+
+        future: asyncio.Future[dict[str, Any] | None] = asyncio.get_running_loop().create_future()
+        # waiters re-raise the leader's error; this keeps asyncio from warning when there are none
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._pending[user_id] = future
+        try:
+            user = await load()
+            data = user._asdict() if user is not None else None
+            if data is not None and user_id not in self._stale:
+                await self.cache.set(self._key(user_id), data)
+            future.set_result(data)
+            return user
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as ex:
+            future.set_exception(ex)
+            raise
+        finally:
+            del self._pending[user_id]
+            self._stale.discard(user_id)
+
+    async def get_user_version(self, user_id: int, db_context: DbContext) -> int | None:
+        cached = await self.cache.get(self._key(user_id))
+        if cached is not None:
+            return cached["version"]
+        return await self.user_service.get_user_version(user_id, db_context)
+
+    async def get_user_summaries(self, user_ids: Sequence[int], db_context: DbContext) -> dict[int, UserSummary]:
+        return await self.user_service.get_user_summaries(user_ids, db_context)
+
+    async def get_all_users(self, db_context: DbContext) -> Sequence[UserEntity]:
+        return await self.user_service.get_all_users(db_context)
+
+    async def get_users_page(
+        self, db_context: DbContext, limit: int, after_id: int | None = None
+    ) -> Sequence[UserSummary]:
+        return await self.user_service.get_users_page(db_context, limit, after_id)
+
+    async def get_users_page_version(
+        self, db_context: DbContext, limit: int, after_id: int | None = None
+    ) -> UsersPageVersion:
+        return await self.user_service.get_users_page_version(db_context, limit, after_id)
+
+    def stream_users(self, db_context: DbContext, after_id: int | None = None) -> AsyncIterator[UserSummary]:
+        return self.user_service.stream_users(db_context, after_id)
+
+    async def invalidate(self, *user_ids: int) -> None:
+        # a query already in flight may have read the old row, so it must not populate the cache
+        self._stale.update(user_id for user_id in user_ids if user_id in self._pending)
+        await self.cache.delete(*(self._key(user_id) for user_id in user_ids))
+
+    async def _on_users_changed(self, identities: list[tuple[Any, ...]]) -> None:
+        await self.invalidate(*(identity[0] for identity in identities))
+
+    @staticmethod
+    def _key(user_id: int) -> str:
+        return f"user:{user_id}"
@@ -1,32 +1,209 @@
+import re
 from abc import ABC, abstractmethod
-from typing import Self, Sequence
+from typing import AsyncIterator, NamedTuple, Self, Sequence
+
+from sqlalchemy.exc import IntegrityError
 
 from app.infrastructure.db.db_context import DbContext
+from app.infrastructure.db.db_context_factory import DbContextFactory
 from app.infrastructure.models.user import UserEntity
 
 
+class UserSummary(NamedTuple):
+    id: int
+    username: str
+    email: str
+    is_active: bool
+    is_superuser: bool
+    version: int
+
+
+class UsersPageVersion(NamedTuple):
+    """Changes with every update, insert or delete of a row in the page.
+
+    Updates raise the version sum. Ids are never reused, so rows leaving or entering the page change
+    the count or raise the id sum.
+    """
+
+    count: int
+    id_sum: int
+    version_sum: int
+
+    @classmethod
+    def of(cls, users: Sequence[UserSummary]) -> "UsersPageVersion":
+        return cls(len(users), sum(user.id for user in users), sum(user.version for user in users))
+
+
+USER_SUMMARY_COLUMNS = (
+    UserEntity.id,
+    UserEntity.username,
+    UserEntity.email,
+    UserEntity.is_active,
+    UserEntity.is_superuser,
+    UserEntity.version,
+)
+
+
+# SQLite names the column, PostgreSQL the unique index; other integrity errors (e.g. NOT NULL) must not match
+_UNIQUE_VIOLATION = re.compile(r'(?:UNIQUE constraint failed: users\.|unique constraint "ix_users_)(username|email)\b')
+
+
+class UserAlreadyExistsError(Exception):
+    pass
+
+
 class IUserService(ABC):
     @abstractmethod
-    async def create_user(self: Self, user: UserEntity, db_context: DbContext) -> UserEntity: ...
+    async def create_user(self: Self, user: UserEntity, db_context: DbContext) -> UserSummary: ...
+
+    @abstractmethod
+    async def import_users(self: Self, users: Sequence[UserEntity], db_context: DbContext) -> list[str | None]: ...
 
     @abstractmethod
     async def get_user(self: Self, user_id: int, db_context: DbContext) -> UserEntity | None: ...
 
+    @abstractmethod
+    async def get_user_summary(self: Self, user_id: int, db_context: DbContext) -> UserSummary | None: ...
+
+    @abstractmethod
+    async def read_user_summary(
+        self: Self, user_id: int, db_context_factory: DbContextFactory
+    ) -> UserSummary | None: ...
+
+    @abstractmethod
+    async def get_user_version(self: Self, user_id: int, db_context: DbContext) -> int | None: ...
+
+    @abstractmethod
+    async def get_user_summaries(
+        self: Self, user_ids: Sequence[int], db_context: DbContext
+    ) -> dict[int, UserSummary]: ...
+
     @abstractmethod
     async def get_all_users(self: Self, db_context: DbContext) -> Sequence[UserEntity]: ...
 
+    @abstractmethod
+    async def get_users_page(
+        self: Self, db_context: DbContext, limit: int, after_id: int | None = None
+    ) -> Sequence[UserSummary]: ...
+
+    @abstractmethod
+    async def get_users_page_version(
+        self: Self, db_context: DbContext, limit: int, after_id: int | None = None
+    ) -> UsersPageVersion: ...
+
+    @abstractmethod
+    def stream_users(self: Self, db_context: DbContext, after_id: int | None = None) -> AsyncIterator[UserSummary]: ...
+
 
 class UserService(IUserService):
     def __init__(self):
         pass
 
-    async def create_user(self, user: UserEntity, db_context: DbContext) -> UserEntity:
-        await db_context.users.add(user)
+    async def create_user(self, user: UserEntity, db_context: DbContext) -> UserSummary:
+        """Inserts the user and commits it, raising ``UserAlreadyExistsError`` if the username or email is taken.
+
+        The unique indexes decide, so there is no check query before the insert.
+        """
+        values = {
+            "username": user.username,
+            "email": user.email,
+            "hashed_password": user.hashed_password,
+            "is_active": user.is_active,
+            "is_superuser": user.is_superuser,
+        }
+        try:
+            row = await db_context.users.insert_returning(values, USER_SUMMARY_COLUMNS)
+        except IntegrityError as ex:
+            match = _UNIQUE_VIOLATION.search(str(ex.orig))
+            if match is None:
+                raise
+            raise UserAlreadyExistsError(f"{match.group(1).capitalize()} already exists") from ex
+        await db_context.save()
+        return UserSummary._make(row)
+
+    async def import_users(self, users: Sequence[UserEntity], db_context: DbContext) -> list[str | None]:
+        """Inserts a batch of users and commits it, skipping rows whose username or email is taken.
+
+        Returns the conflict reason for every user, or None for users that were created.
+        """
+        conflicts: list[str | None] = [None] * len(users)
+        existing = await db_context.users.project(
+            (UserEntity.username, UserEntity.email),
+            or_conditions=[
+                UserEntity.username.in_([user.username for user in users]),
+                UserEntity.email.in_([user.email for user in users]),
+            ]
+        )
+        taken_usernames = {user.username for user in existing}
+        taken_emails = {user.email for user in existing}
+
+        to_insert: list[int] = []
+        for index, user in enumerate(users):
+            if user.username in taken_usernames:
+                conflicts[index] = "Username already exists"
+            elif user.email in taken_emails:
+                conflicts[index] = "Email already exists"
+            else:
+                taken_usernames.add(user.username)
+                taken_emails.add(user.email)
+                to_insert.append(index)
+
+        try:
+            async with db_context.savepoint():
+                await db_context.users.add_all([users[index] for index in to_insert])
+        except IntegrityError:
+            # a concurrent writer took some of the names after the check, so find them row by row
+            for index in to_insert:
+                try:
+                    async with db_context.savepoint():
+                        await db_context.users.add(users[index])
+                except IntegrityError:
+                    conflicts[index] = "Username or email already exists"
+
         await db_context.save()
-        return user
+        return conflicts
 
     async def get_user(self, user_id: int, db_context: DbContext) -> UserEntity | None:
-        return await db_context.users.get(user_id)
+        return await db_context.users.try_get(user_id)
+
+    async def get_user_summary(self, user_id: int, db_context: DbContext) -> UserSummary | None:
+        row = await db_context.users.try_project_first(USER_SUMMARY_COLUMNS, UserEntity.id == user_id)
+        return UserSummary._make(row) if row is not None else None
+
+    async def read_user_summary(self, user_id: int, db_context_factory: DbContextFactory) -> UserSummary | None:
+        """``get_user_summary`` outside of a transaction; the service opens a read-only context if it needs one."""
+        async with db_context_factory.create_db_context(read_only=True, autocommit=True) as db_context:
+            return await self.get_user_summary(user_id, db_context)
+
+    async def get_user_version(self, user_id: int, db_context: DbContext) -> int | None:
+        row = await db_context.users.try_project_first((UserEntity.version,), UserEntity.id == user_id)
+        return row.version if row is not None else None
+
+    async def get_user_summaries(self, user_ids: Sequence[int], db_context: DbContext) -> dict[int, UserSummary]:
+        rows = await db_context.users.project(USER_SUMMARY_COLUMNS, UserEntity.id.in_(user_ids))
+        return {row.id: UserSummary._make(row) for row in rows}
 
     async def get_all_users(self, db_context: DbContext) -> Sequence[UserEntity]:
         return await db_context.users.all()
+
+    async def get_users_page(
+        self, db_context: DbContext, limit: int, after_id: int | None = None
+    ) -> Sequence[UserSummary]:
+        criteria = (UserEntity.id > after_id,) if after_id is not None else ()
+        rows = await db_context.users.project(USER_SUMMARY_COLUMNS, *criteria, order_by=UserEntity.id, limit=limit)
+        return [UserSummary._make(row) for row in rows]
+
+    async def get_users_page_version(
+        self, db_context: DbContext, limit: int, after_id: int | None = None
+    ) -> UsersPageVersion:
+        """The ``UsersPageVersion`` of ``get_users_page`` with the same arguments, without reading the rows."""
+        criteria = (UserEntity.id > after_id,) if after_id is not None else ()
+        row = await db_context.users.summarize(
+            (UserEntity.id, UserEntity.version), *criteria, order_by=UserEntity.id, limit=limit
+        )
+        return UsersPageVersion._make(row)
+
+    async def stream_users(self, db_context: DbContext, after_id: int | None = None) -> AsyncIterator[UserSummary]:
+        criteria = (UserEntity.id > after_id,) if after_id is not None else ()
+        async for row in db_context.users.stream_project(USER_SUMMARY_COLUMNS, *criteria, order_by=UserEntity.id):
+            yield UserSummary._make(row)
@@ -1,18 +1,47 @@
-from fastapi import APIRouter, HTTPException, Request
+import json
+from collections.abc import AsyncIterator
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from fastapi_utils.cbv import cbv
+from pydantic import ValidationError
 
 from app.infrastructure.db.db_context_factory import DbContextFactory
 from app.infrastructure.security.password_manager import IPasswordManager
-from app.infrastructure.services.user_service import IUserService
+from app.infrastructure.services.user_service import IUserService, UserAlreadyExistsError, UsersPageVersion
 from app.presentation.di import resolve
 from app.presentation.middlewares.permissions import (
     allow_anonymous,
     require_permissions,
 )
-from app.presentation.schemas.user import User, UserCreate
+from app.presentation.responses import (
+    CONDITIONAL_CACHE_CONTROL,
+    RawJSONResponse,
+    RowSerializer,
+    compute_etag,
+    etag_matches,
+    not_modified,
+)
+from app.presentation.schemas.pagination import decode_cursor, encode_cursor
+from app.presentation.schemas.user import (
+    User,
+    UserCreate,
+    UserImportResult,
+    UserImportSummary,
+)
+from app.presentation.settings import settings
 
 router = APIRouter()
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+USERS_PAGE_DEFAULT_LIMIT = 100
+USERS_PAGE_MAX_LIMIT = 1000
+USERS_STREAM_CHUNK_SIZE = 500
+USERS_IMPORT_MAX_BATCH_SIZE = 5000
+
+# fast path for reads: projections are written straight to JSON in the User shape, see fast_json_responses
+user_serializer = RowSerializer(User)
+
 
 @cbv(router)
 class UserController:
@@ -26,28 +55,188 @@ class UserController:
         self.db_context_factory = db_context_factory
         self.password_manager = password_manager
 
-    @router.post("/users", response_model=User)
+    @router.post("/users", response_model=User, responses={409: {"description": "Username or email already exists"}})
     @require_permissions(["user:create"])
-    async def create_user(self, request: Request, user: UserCreate) -> User:
-        async with self.db_context_factory.create_db_context() as db_context:
-            user_entity = await self.user_service.create_user(user.to_entity(self.password_manager), db_context)
-            return User.model_validate(user_entity)
+    async def create_user(self, request: Request, user: UserCreate) -> User | Response:
+        new_user = await user.to_entity(self.password_manager)
+        try:
+            async with self.db_context_factory.create_db_context() as db_context:
+                created = await self.user_service.create_user(new_user, db_context)
+        except UserAlreadyExistsError as ex:
+            raise HTTPException(status_code=409, detail=str(ex))
 
-    @router.get("/users/{user_id}", response_model=User)
+        if settings.fast_json_responses:
+            return RawJSONResponse(user_serializer.dump(created))
+        return User.model_validate(created)
+
+    @router.post(
+        "/users/bulk",
+        response_model=UserImportSummary,
+        openapi_extra={
+            "requestBody": {
+                "required": True,
+                "content": {
+                    "application/json": {
+                        "schema": {"type": "array", "items": {"$ref": "#/components/schemas/UserCreate"}}
+                    },
+                    NDJSON_MEDIA_TYPE: {"schema": {"$ref": "#/components/schemas/UserCreate"}},
+                },
+            }
+        },
+    )
+    @require_permissions(["user:create"])
+    async def import_users(
+        self,
+        request: Request,
+        batch_size: int = Query(default=settings.user_import_batch_size, ge=1, le=USERS_IMPORT_MAX_BATCH_SIZE),
+    ) -> UserImportSummary:
+        results: list[UserImportResult] = []
+        batch: list[tuple[int, UserCreate]] = []
+        index = 0
+        async for row in self._read_import_rows(request):
+            try:
+                user = UserCreate.model_validate_json(row) if isinstance(row, bytes) else UserCreate.model_validate(row)
+            except ValidationError as ex:
+                detail = "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in ex.errors())
+                results.append(UserImportResult(index=index, status="invalid", detail=detail))
+            else:
+                batch.append((index, user))
+                if len(batch) >= batch_size:
+                    results.extend(await self._import_batch(batch))
+                    batch = []
+            index += 1
+        if batch:
+            results.extend(await self._import_batch(batch))
+
+        results.sort(key=lambda result: result.index)
+        return UserImportSummary(
+            created=sum(result.status == "created" for result in results),
+            conflicts=sum(result.status == "conflict" for result in results),
+            invalid=sum(result.status == "invalid" for result in results),
+            results=results,
+        )
+
+    @router.get("/users/{user_id}", response_model=User, responses={304: {"description": "Not modified"}})
     @require_permissions(["user:read"])
-    async def get_user(self, request: Request, user_id: int) -> User:
-        async with self.db_context_factory.create_db_context() as db_context:
-            user = await self.user_service.get_user(user_id, db_context)
-            if user is None:
-                raise HTTPException(status_code=404, detail="User not found")
-            return User.model_validate(user)
+    async def get_user(self, request: Request, response: Response, user_id: int) -> User | Response:
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match:
+            async with self.db_context_factory.create_db_context(read_only=True, autocommit=True) as db_context:
+                # revalidation only needs the version, which the (id, version) index holds
+                version = await self.user_service.get_user_version(user_id, db_context)
+            if version is not None and etag_matches(if_none_match, compute_etag(user_id, version)):
+                return not_modified(compute_etag(user_id, version))
+        # the service opens a context only if it needs one, so a batching service holds no connection while waiting
+        user = await self.user_service.read_user_summary(user_id, self.db_context_factory)
+        if user is None:
+            raise HTTPException(status_code=404, detail="User not found")
 
-    @router.get("/users", response_model=list[User])
+        etag = compute_etag(user.id, user.version)
+        response.headers.update({"ETag": etag, "Cache-Control": CONDITIONAL_CACHE_CONTROL})
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+        if settings.fast_json_responses:
+            return RawJSONResponse(user_serializer.dump(user), headers=dict(response.headers))
+        return User.model_validate(user)
+
+    @router.get(
+        "/users",
+        response_model=list[User],
+        responses={
+            200: {"content": {NDJSON_MEDIA_TYPE: {}}, "headers": {"X-Next-Cursor": {"schema": {"type": "string"}}}},
+            304: {"description": "Not modified"},
+        },
+    )
     @require_permissions(["user:read"])
-    async def get_all_users(self, request: Request) -> list[User]:
+    async def get_all_users(
+        self,
+        request: Request,
+        response: Response,
+        limit: int = Query(default=USERS_PAGE_DEFAULT_LIMIT, ge=1, le=USERS_PAGE_MAX_LIMIT),
+        after: str | None = None,
+    ) -> list[User] | Response:
+        try:
+            after_id = decode_cursor(after) if after else None
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+        if NDJSON_MEDIA_TYPE in request.headers.get("Accept", ""):
+            return StreamingResponse(self._stream_users(after_id), media_type=NDJSON_MEDIA_TYPE)
+
+        if_none_match = request.headers.get("If-None-Match")
+        async with self.db_context_factory.create_db_context(read_only=True, autocommit=True) as db_context:
+            # one extra row tells whether there is a next page without a COUNT query, and is part of the page version
+            if if_none_match:
+                page_version = await self.user_service.get_users_page_version(db_context, limit + 1, after_id)
+                if etag_matches(if_none_match, compute_etag(*page_version)):
+                    return not_modified(compute_etag(*page_version))
+            users = list(await self.user_service.get_users_page(db_context, limit + 1, after_id))
+
+        etag = compute_etag(*UsersPageVersion.of(users))
+        if len(users) > limit:
+            users = users[:limit]
+            response.headers["X-Next-Cursor"] = encode_cursor(users[-1].id)
+
+        response.headers.update({"ETag": etag, "Cache-Control": CONDITIONAL_CACHE_CONTROL})
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
+        if settings.fast_json_responses:
+            # a returned Response bypasses the injected one, so its headers are carried over
+            return RawJSONResponse(user_serializer.dump_many(users), headers=dict(response.headers))
+        return [User.model_validate(user) for user in users]
+
+    async def _stream_users(self, after_id: int | None) -> AsyncIterator[bytes]:
+        async with self.db_context_factory.create_db_context(read_only=True) as db_context:
+            chunk: list[bytes] = []
+            async for user in self.user_service.stream_users(db_context, after_id):
+                if settings.fast_json_responses:
+                    chunk.append(user_serializer.dump(user))
+                else:
+                    chunk.append(User.model_validate(user).model_dump_json().encode())
+                if len(chunk) >= USERS_STREAM_CHUNK_SIZE:
+                    yield b"\n".join(chunk) + b"\n"
+                    chunk.clear()
+            if chunk:
+                yield b"\n".join(chunk) + b"\n"
+
+    async def _read_import_rows(self, request: Request) -> AsyncIterator[bytes | object]:
+        if NDJSON_MEDIA_TYPE in request.headers.get("Content-Type", ""):
+            buffer = b""
+            async for chunk in request.stream():
+                *lines, buffer = (buffer + chunk).split(b"\n")
+                for line in lines:
+                    if line.strip():
+                        yield line
+            if buffer.strip():
+                yield buffer
+            return
+
+        try:
+            rows = json.loads(await request.body())
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Request body must be a JSON array")
+        if not isinstance(rows, list):
+            raise HTTPException(status_code=400, detail="Request body must be a JSON array")
+        for row in rows:
+            yield row
+
+    async def _import_batch(self, batch: list[tuple[int, UserCreate]]) -> list[UserImportResult]:
+        # hash before opening the context, so no connection is held while bcrypt runs
+        hashed_passwords = await self.password_manager.hash_passwords_async([user.password for _, user in batch])
+        entities = [
+            user.to_entity_with_hashed_password(hashed_password)
+            for (_, user), hashed_password in zip(batch, hashed_passwords)
+        ]
         async with self.db_context_factory.create_db_context() as db_context:
-            users = await self.user_service.get_all_users(db_context)
-            return [User.model_validate(user) for user in users]
+            conflicts = await self.user_service.import_users(entities, db_context)
+
+        return [
+            UserImportResult(index=index, status="conflict", detail=conflict)
+            if conflict is not None
+            else UserImportResult(index=index, status="created", id=entity.id)
+            for (index, _), entity, conflict in zip(batch, entities, conflicts)
+        ]
 
     @router.get("/public", response_model=str)
     @allow_anonymous("/api/public")
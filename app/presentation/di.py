@@ -1,31 +1,172 @@
+import os
+import time
 from typing import Callable, Type
 
 from fastapi import Depends
-from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncEngine
 
+from app.infrastructure.cache.cache_backend import ICacheBackend, InMemoryCacheBackend
 from app.infrastructure.db.db_context_factory import DbContextFactory
-from app.infrastructure.dependencies.service_collection import ServiceCollection
+from app.infrastructure.db.engine import PoolOptions, create_engine
+from app.infrastructure.db.replica_router import ReplicaRouter
+from app.infrastructure.db.sqlite import SqliteOptions, create_sqlite_engines, is_sqlite_file
+from app.infrastructure.dependencies.service_collection import ServiceCollection, ServiceProvider
+from app.infrastructure.metrics.metrics import di_resolve_duration, metrics
+from app.infrastructure.metrics.multiprocess import MetricsDirectory
 from app.infrastructure.security.password_manager import (
     IPasswordManager,
     PasswordManager,
 )
+from app.infrastructure.services.batched_user_service import BatchedUserService
+from app.infrastructure.services.cached_user_service import CachedUserService
 from app.infrastructure.services.user_service import IUserService, UserService
-from app.presentation.settings import settings
+from app.presentation.settings import Settings, settings
 
-engine = create_async_engine(settings.database_url, echo=settings.debug)
 
-# DI setup
-services = ServiceCollection()
-services.add_singleton(AsyncEngine, engine)
-services.add_singleton(DbContextFactory, DbContextFactory)
-services.add_transient(IUserService, UserService)
-services.add_transient(IPasswordManager, PasswordManager)
+def get_pool_options(settings: Settings, database_url: str) -> PoolOptions:
+    # unset pool settings fall back to the defaults of the database driver
+    return PoolOptions.for_url(
+        database_url,
+        pool=settings.db_pool,
+        size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        timeout=settings.db_pool_timeout,
+        recycle=settings.db_pool_recycle,
+        pre_ping=settings.db_pool_pre_ping,
+    )
 
-service_provider = services.build_service_provider()
+
+class Container:
+    """Engines, pools and the DI graph of one worker process.
+
+    Nothing here is created at import time, so the application module can be imported by the gunicorn
+    master (``--preload``) and shared with the workers without sharing connections or executors.
+    """
+
+    def __init__(self, settings: Settings) -> None:
+        self.pool_options = get_pool_options(settings, settings.database_url)
+        self.read_engine: AsyncEngine | None = None
+        if settings.sqlite_profile == "performance" and is_sqlite_file(settings.database_url):
+            sqlite_options = SqliteOptions(
+                mmap_size=settings.sqlite_mmap_size,
+                cache_size_kib=settings.sqlite_cache_size_kib,
+                busy_timeout_ms=settings.sqlite_busy_timeout_ms,
+            )
+            self.engine, self.read_engine = create_sqlite_engines(
+                settings.database_url, self.pool_options, sqlite_options, settings.debug, settings.metrics_enabled
+            )
+        else:
+            self.engine = create_engine(
+                settings.database_url, self.pool_options, echo=settings.debug, instrumented=settings.metrics_enabled
+            )
+
+        self.replica_router: ReplicaRouter | None = None
+        if settings.database_replica_urls:
+            replica_engines = [
+                # pool gauges are reported for the primary only
+                create_engine(
+                    url, get_pool_options(settings, url), settings.debug, settings.metrics_enabled, pool_gauges=False
+                )
+                for url in settings.database_replica_urls
+            ]
+            self.replica_router = ReplicaRouter(
+                replica_engines,
+                strategy=settings.database_replica_strategy,
+                sticky_seconds=settings.read_your_writes_seconds,
+                retry_seconds=settings.database_replica_retry_seconds,
+            )
+            metrics.gauge(
+                "db_replicas_healthy", "Read replicas currently receiving reads", self.replica_router.healthy_count
+            )
+
+        self.password_manager = PasswordManager(
+            executor_type=settings.password_hashing_executor,
+            max_workers=settings.password_hashing_workers,
+            max_queue_size=settings.password_hashing_max_queue_size,
+        )
+        metrics.gauge(
+            "password_hashing_in_flight", "bcrypt operations running or queued", lambda: self.password_manager.in_flight
+        )
+
+        # gunicorn workers share nothing, so /metrics merges the snapshots every worker writes to this directory
+        self.metrics_directory: MetricsDirectory | None = None
+        if settings.metrics_enabled and settings.metrics_multiprocess_dir:
+            self.metrics_directory = MetricsDirectory(
+                metrics, settings.metrics_multiprocess_dir, settings.metrics_flush_interval_seconds
+            )
+
+        self.db_context_factory = DbContextFactory(self.engine, self.replica_router, self.read_engine)
+        self.service_provider = self._build_service_provider(settings)
+
+    @property
+    def engines(self) -> list[AsyncEngine]:
+        return [
+            self.engine,
+            *((self.read_engine,) if self.read_engine is not None else ()),
+            *(self.replica_router.replicas if self.replica_router is not None else ()),
+        ]
+
+    def _build_service_provider(self, settings: Settings) -> ServiceProvider:
+        services = ServiceCollection()
+        services.add_singleton(AsyncEngine, self.engine)
+        services.add_singleton(DbContextFactory, self.db_context_factory)
+
+        # a batching user service is shared by the whole worker, so lookups from concurrent requests land in one batch
+        user_service: UserService | Type[UserService] = UserService
+        add_user_service = services.add_transient
+        if settings.user_batch_loading:
+            user_service = BatchedUserService(
+                self.db_context_factory, settings.user_batch_window_seconds, settings.user_batch_max_size
+            )
+            add_user_service = services.add_singleton
+
+        if settings.user_cache_size > 0:
+            services.add_singleton(
+                ICacheBackend, InMemoryCacheBackend(settings.user_cache_size, settings.user_cache_ttl_seconds)
+            )
+            add_user_service(UserService, user_service)
+            services.add_singleton(IUserService, CachedUserService)
+        else:
+            add_user_service(IUserService, user_service)
+        services.add_singleton(IPasswordManager, self.password_manager)
+
+        return services.build_service_provider()
+
+
+_container: Container | None = None
+
+
+def get_container() -> Container:
+    global _container
+    if _container is None:
+        _container = Container(settings)
+    return _container
+
+
+def _discard_container_after_fork() -> None:
+    global _container
+    if _container is not None:
+        # the parent process still owns these connections, so the child drops them without closing
+        for engine in _container.engines:
+            engine.sync_engine.dispose(close=False)
+        _container = None
+
+
+os.register_at_fork(after_in_child=_discard_container_after_fork)
 
 
 def resolve(dependency: Type[object]) -> Callable[..., object]:
+    labels = (dependency.__name__,)
+
+    # still declared async for sync services, so FastAPI calls it inline instead of in the threadpool
     async def _resolver() -> object:
-        return await service_provider.get_service(dependency)
+        start = time.perf_counter()
+        service_provider = get_container().service_provider
+        if service_provider.is_async(dependency):
+            service = await service_provider.get_service(dependency)
+        else:
+            service = service_provider.get_service_sync(dependency)
+        di_resolve_duration.observe(time.perf_counter() - start, labels)
+        return service
 
     return Depends(_resolver)  # type: ignore
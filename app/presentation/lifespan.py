@@ -0,0 +1,58 @@
+import asyncio
+import logging
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+from sqlalchemy.orm import configure_mappers
+
+from app.infrastructure.db.engine import warm_up_pool
+from app.presentation.di import get_container
+from app.presentation.settings import settings
+
+
+@asynccontextmanager
+async def _phase(name: str) -> AsyncIterator[None]:
+    start = time.perf_counter()
+    yield
+    logging.info("%s took %.3fs", name, time.perf_counter() - start)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Prepares the worker before it accepts traffic and releases its connections and executors on shutdown."""
+    async with _phase("Startup: container"):
+        container = get_container()
+        app.state.service_provider = container.service_provider
+
+    async with _phase("Startup: singletons and mappers"):
+        configure_mappers()
+        await container.service_provider.initialize_singletons()
+
+    if settings.db_pool_warmup > 0:
+        async with _phase("Startup: opening database connections"):
+            engines = [container.engine, *((container.read_engine,) if container.read_engine is not None else ())]
+            await asyncio.gather(*(warm_up_pool(engine, settings.db_pool_warmup) for engine in engines))
+
+    metrics_flush = None
+    if container.metrics_directory is not None:
+        metrics_flush = asyncio.create_task(container.metrics_directory.run())
+
+    yield
+
+    if metrics_flush is not None:
+        # cancelling writes a final snapshot, so the requests of this worker stay counted after it exits
+        metrics_flush.cancel()
+        await asyncio.gather(metrics_flush, return_exceptions=True)
+
+    async with _phase("Shutdown: draining database contexts"):
+        remaining = await container.db_context_factory.drain(settings.shutdown_drain_timeout_seconds)
+        if remaining:
+            logging.warning("Shutdown: %d database contexts still open after the drain timeout", remaining)
+
+    async with _phase("Shutdown: disposing engines"):
+        await asyncio.gather(*(engine.dispose() for engine in container.engines))
+
+    async with _phase("Shutdown: stopping password hashing workers"):
+        await asyncio.to_thread(container.password_manager.shutdown)
@@ -1,24 +1,51 @@
-from typing import Callable
+from typing import Any
 
 from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 
+from app.infrastructure.metrics.metrics import metrics
+from app.infrastructure.security.password_manager import PasswordManagerOverloadedError
 from app.presentation.controllers.user_controller import router as user_router
-from app.presentation.di import service_provider
-from app.presentation.middlewares.permissions import token_middleware
+from app.presentation.di import get_container
+from app.presentation.lifespan import lifespan
+from app.presentation.middlewares.metrics import MetricsMiddleware
+from app.presentation.middlewares.permissions import TokenMiddleware, anonymous_routes, document_permissions
+from app.presentation.middlewares.service_scope import ServiceScopeMiddleware
+from app.presentation.settings import settings
 
-app = FastAPI(swagger_ui_parameters={"syntaxHighlight": True})
+app = FastAPI(swagger_ui_parameters={"syntaxHighlight": True}, lifespan=lifespan)
 
+app.add_middleware(TokenMiddleware)
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
 
-@app.middleware("http")
-async def add_token_middleware(request: Request, call_next: Callable):
-    return await token_middleware(request, call_next)
+# Added last so it wraps every other middleware and scoped services are available to all of them
+app.add_middleware(ServiceScopeMiddleware, get_service_provider=lambda: get_container().service_provider)
+
+
+@app.exception_handler(PasswordManagerOverloadedError)
+async def password_manager_overloaded_handler(request: Request, exc: PasswordManagerOverloadedError):
+    return JSONResponse(content={"detail": str(exc)}, status_code=503, headers={"Retry-After": "1"})
 
 
 # Register routes
 app.include_router(user_router, prefix="/api")
 
 
-# Add ServiceProvider to app state
-@app.on_event("startup")
-async def startup_event():
-    app.state.service_provider = service_provider
+def openapi() -> dict[str, Any]:
+    if app.openapi_schema is None:
+        app.openapi_schema = document_permissions(FastAPI.openapi(app), app.routes)
+    return app.openapi_schema
+
+
+app.openapi = openapi  # type: ignore
+
+if settings.metrics_enabled:
+    @app.get(settings.metrics_path, include_in_schema=False)
+    async def metrics_endpoint() -> PlainTextResponse:
+        metrics_directory = get_container().metrics_directory
+        content = await metrics_directory.render() if metrics_directory is not None else metrics.render()
+        return PlainTextResponse(content, media_type="text/plain; version=0.0.4")
+
+    if settings.metrics_anonymous:
+        anonymous_routes.add(settings.metrics_path)
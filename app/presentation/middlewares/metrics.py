@@ -0,0 +1,50 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.infrastructure.metrics.metrics import (
+    RequestStats,
+    current_request_stats,
+    http_request_db_duration,
+    http_request_db_statements,
+    http_request_duration,
+)
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class MetricsMiddleware:
+    """Records latency and SQL statement count/time per route template."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            current_request_stats.reset(token)
+
+            # the router stores the matched route in the scope; labelling by its template keeps cardinality bounded
+            route = scope.get("route")
+            route_path = getattr(route, "path", UNMATCHED_ROUTE)
+            method = scope["method"]
+            http_request_duration.observe(duration, (method, route_path, str(status)))
+            http_request_db_statements.observe(stats.db_statements, (method, route_path))
+            http_request_db_duration.observe(stats.db_seconds, (method, route_path))
@@ -1,20 +1,58 @@
+import math
+import time
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from functools import wraps
-from typing import Any, Callable, Coroutine
+from typing import Any, Callable, Iterable
 
 import jwt
 from fastapi import HTTPException, Request, Security
 from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jwt import PyJWTError
-from starlette.responses import Response
+from starlette.requests import cookie_parser
+from starlette.routing import BaseRoute
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-from app.presentation.settings import load_settings
+from app.infrastructure.db.replica_router import ReadConsistency, current_read_consistency
+from app.infrastructure.metrics.metrics import token_verification_duration
+from app.infrastructure.security.permission_registry import PermissionRegistry
+from app.infrastructure.security.token_claims_cache import TokenClaimsCache, VerifiedToken
+from app.presentation.settings import settings
 
-settings = load_settings()
+BEARER_SCHEME = "bearerAuth"
+# time of the client's last write, sent back by the client so every worker keeps its reads on the primary
+LAST_WRITE_COOKIE = "last_write"
 
 anonymous_routes: set[str] = set()
 
+permission_registry = PermissionRegistry()
+
+
+@dataclass(frozen=True)
+class PermissionRequirement:
+    permissions: tuple[str, ...]
+    mask: int
+
+
+@dataclass(frozen=True)
+class RoutePermissions:
+    method: str
+    path: str
+    permissions: tuple[str, ...]
+    anonymous: bool
+
+
+# filled by require_permissions at import time, keyed by the endpoint it returns
+permission_requirements: dict[Callable, PermissionRequirement] = {}
+
+token_claims_cache: TokenClaimsCache | None = (
+    TokenClaimsCache(settings.token_claims_cache_size, settings.token_claims_cache_ttl_seconds)
+    if settings.token_claims_cache_size > 0
+    else None
+)
+
 
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
@@ -26,41 +64,116 @@ def create_access_token(data: dict) -> str:
 
 
 def verify_token(token: str) -> dict[str, object]:
+    return authenticate(token).claims
+
+
+def authenticate(token: str) -> VerifiedToken:
+    """Verifies ``token`` and turns its permissions into a mask once, not on every permission check."""
+    start = time.perf_counter()
+    if token_claims_cache is not None:
+        cached = token_claims_cache.get(token)
+        if cached is not None:
+            token_verification_duration.observe(time.perf_counter() - start, ("true",))
+            return cached
+
     try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm], options={"require": ["exp"]})
         if datetime.fromtimestamp(payload["exp"], tz=timezone.utc) < datetime.now(timezone.utc):
             raise HTTPException(status_code=401, detail="Token has expired")
-        return payload  # type: ignore
     except PyJWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+    permissions = payload.get("permissions", [])
+    if not isinstance(permissions, list) or not all(isinstance(permission, str) for permission in permissions):
+        raise HTTPException(status_code=401, detail="Invalid token")
 
-async def token_middleware(request: Request, call_next: Callable[[Request], Coroutine[Any, Any, Response]]) -> Response:
-    try:
-        if request.url.path in anonymous_routes or request.url.path in [
-            "/docs",
-            "/openapi.json",
-        ]:
-            return await call_next(request)
-
-        authorization: str | None = request.headers.get("Authorization")
-        if authorization is None:
-            raise HTTPException(status_code=403, detail="Authorization header missing")
-
-        token = authorization.split(" ")[1] if len(authorization.split(" ")) == 2 else None
-
-        if token is None:
-            raise HTTPException(status_code=403, detail="Invalid Authorization header format")
-
-        verify_token(token)
-
-        request.state.token = token
-        response: Response = await call_next(request)
-        return response
-    except HTTPException as exc:
-        return JSONResponse(content={"detail": exc.detail}, status_code=exc.status_code)
-    except Exception as exc:
-        return JSONResponse(content={"detail": f"Error: {str(exc)}"}, status_code=500)
+    verified = VerifiedToken(payload, permission_registry.mask(permissions))
+    if token_claims_cache is not None:
+        token_claims_cache.set(token, verified)
+    token_verification_duration.observe(time.perf_counter() - start, ("false",))
+    return verified
+
+
+def get_permission_mask(request: Request) -> int:
+    mask = getattr(request.state, "permission_mask", None)
+    if mask is None:
+        mask = authenticate(request.state.token).permission_mask
+        request.state.permission_mask = mask
+    return mask
+
+
+class TokenMiddleware:
+    """Authenticates requests from the raw ASGI scope.
+
+    Responses, including streamed ones, are passed through untouched.
+    """
+
+    default_anonymous_paths = frozenset({"/docs", "/openapi.json"})
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        # the middleware stack is built on the first request, after every controller registered its routes
+        self.anonymous_paths = self.default_anonymous_paths | anonymous_routes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.anonymous_paths:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            token = self._get_token(scope)
+            payload, permission_mask = authenticate(token)
+        except HTTPException as exc:
+            await JSONResponse(content={"detail": exc.detail}, status_code=exc.status_code)(scope, receive, send)
+            return
+
+        scope.setdefault("state", {}).update(token=token, token_payload=payload, permission_mask=permission_mask)
+        # lets reads that follow this client's own writes stay on the primary database
+        consistency = ReadConsistency(
+            client_key=str(payload["sub"]) if "sub" in payload else None, last_write_at=self._get_last_write(scope)
+        )
+        read_consistency = current_read_consistency.set(consistency)
+
+        response_started = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started
+            response_started = True
+            if message["type"] == "http.response.start" and consistency.wrote:
+                max_age = math.ceil(settings.read_your_writes_seconds)
+                cookie = f"{LAST_WRITE_COOKIE}={time.time()!r}; Max-Age={max_age}; Path=/; HttpOnly; SameSite=Lax"
+                message["headers"] = [*message.get("headers", ()), (b"set-cookie", cookie.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as exc:
+            if response_started:
+                raise
+            await JSONResponse(content={"detail": f"Error: {str(exc)}"}, status_code=500)(scope, receive, send)
+        finally:
+            current_read_consistency.reset(read_consistency)
+
+    @staticmethod
+    def _get_last_write(scope: Scope) -> float | None:
+        for name, value in scope["headers"]:
+            if name == b"cookie":
+                try:
+                    return float(cookie_parser(value.decode("latin-1"))[LAST_WRITE_COOKIE])
+                except (KeyError, ValueError):
+                    return None
+        return None
+
+    @staticmethod
+    def _get_token(scope: Scope) -> str:
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                parts = value.split(b" ")
+                if len(parts) != 2:
+                    raise HTTPException(status_code=403, detail="Invalid Authorization header format")
+                return parts[1].decode("latin-1")
+
+        raise HTTPException(status_code=403, detail="Authorization header missing")
 
 
 def get_credentials(credentials: HTTPAuthorizationCredentials = Security(HTTPBearer())) -> HTTPAuthorizationCredentials:
@@ -68,6 +181,8 @@ def get_credentials(credentials: HTTPAuthorizationCredentials = Security(HTTPBea
 
 
 def require_permissions(required_permissions: list[str]) -> Callable:
+    required_mask = permission_registry.register(required_permissions)
+
     def decorator(func: Callable) -> Callable:
         @wraps(func)
         async def wrapper(*args, **kwargs) -> object:
@@ -75,14 +190,12 @@ def require_permissions(required_permissions: list[str]) -> Callable:
             if not request:
                 raise HTTPException(status_code=400, detail="Request object is missing")
 
-            payload = verify_token(request.state.token)
-            user_permissions = set(payload.get("permissions", []))  # type: ignore
-
-            if not user_permissions.issuperset(set(required_permissions)):
+            if get_permission_mask(request) & required_mask != required_mask:
                 raise HTTPException(status_code=403, detail="Permission denied")
 
             return await func(*args, **kwargs)
 
+        permission_requirements[wrapper] = PermissionRequirement(tuple(required_permissions), required_mask)
         return wrapper
 
     return decorator
@@ -99,3 +212,31 @@ def allow_anonymous(route_path: str) -> Callable:
         return wrapper
 
     return decorator
+
+
+def route_permissions(routes: Iterable[BaseRoute]) -> list[RoutePermissions]:
+    """Lists the permissions every API route requires, e.g. for an audit of ``app.routes``."""
+    entries = []
+    for route in routes:
+        if not isinstance(route, APIRoute):
+            continue
+        requirement = permission_requirements.get(route.endpoint)
+        permissions = requirement.permissions if requirement is not None else ()
+        for method in sorted(route.methods):
+            entries.append(RoutePermissions(method, route.path, permissions, route.path in anonymous_routes))
+    return entries
+
+
+def document_permissions(schema: dict[str, Any], routes: Iterable[BaseRoute]) -> dict[str, Any]:
+    """Adds the bearer scheme to an OpenAPI schema, with the required permissions as each operation's scopes."""
+    schema.setdefault("components", {}).setdefault("securitySchemes", {})[BEARER_SCHEME] = {
+        "type": "http",
+        "scheme": "bearer",
+        "bearerFormat": "JWT",
+    }
+    schema["security"] = [{BEARER_SCHEME: []}]
+    for entry in route_permissions(routes):
+        operation = schema.get("paths", {}).get(entry.path, {}).get(entry.method.lower())
+        if operation is not None:
+            operation["security"] = [] if entry.anonymous else [{BEARER_SCHEME: list(entry.permissions)}]
+    return schema
@@ -0,0 +1,22 @@
+from typing import Callable
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.infrastructure.dependencies.service_collection import ServiceProvider
+
+
+class ServiceScopeMiddleware:
+    """Opens a DI scope for every HTTP/websocket request and disposes it once the response is sent."""
+
+    def __init__(self, app: ASGIApp, get_service_provider: Callable[[], ServiceProvider]) -> None:
+        self.app = app
+        # the middleware stack is built on the first ASGI call, i.e. in the worker and not at import time
+        self.service_provider = get_service_provider()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        async with self.service_provider.create_scope():
+            await self.app(scope, receive, send)
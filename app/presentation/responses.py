@@ -0,0 +1,68 @@
+import json
+from hashlib import blake2b
+from operator import attrgetter
+from typing import Any, Iterable
+
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # installed with the project; the standard library encoder is the fallback without it
+    orjson = None
+
+
+# responses to authenticated requests must not be kept by shared caches; clients revalidate with If-None-Match
+CONDITIONAL_CACHE_CONTROL = "private, no-cache"
+
+
+def dump_json(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class RowSerializer:
+    """Serialises rows straight to the JSON shape of ``model``, without building or validating model instances.
+
+    Only suitable for models without aliases or custom serializers whose fields are read from trusted
+    rows (e.g. column projections) that already hold JSON-compatible values.
+    """
+
+    def __init__(self, model: type[BaseModel]) -> None:
+        self.fields = tuple(model.model_fields)
+        getter = attrgetter(*self.fields)
+        self._values = getter if len(self.fields) > 1 else lambda row: (getter(row),)
+
+    def to_dict(self, row: Any) -> dict[str, Any]:
+        return dict(zip(self.fields, self._values(row)))
+
+    def dump(self, row: Any) -> bytes:
+        return dump_json(self.to_dict(row))
+
+    def dump_many(self, rows: Iterable[Any]) -> bytes:
+        return dump_json([self.to_dict(row) for row in rows])
+
+
+class RawJSONResponse(Response):
+    """Response for content that is already encoded JSON; FastAPI sends returned Response objects as they are."""
+
+    media_type = "application/json"
+
+
+def compute_etag(*version: int) -> str:
+    """Strong ETag of a row or page version, so it is known without loading or serialising the response."""
+    return f'"{blake2b(repr(version).encode(), digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison, so W/ prefixes are ignored
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CONDITIONAL_CACHE_CONTROL})
@@ -0,0 +1,18 @@
+import base64
+import binascii
+
+
+def encode_cursor(last_id: int) -> str:
+    return base64.urlsafe_b64encode(f"id:{last_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        decoded = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except (binascii.Error, UnicodeDecodeError) as ex:
+        raise ValueError("Invalid cursor") from ex
+
+    prefix, _, last_id = decoded.partition(":")
+    if prefix != "id" or not last_id.isdigit():
+        raise ValueError("Invalid cursor")
+    return int(last_id)
@@ -1,4 +1,6 @@
-from pydantic import BaseModel
+from typing import Literal
+
+from pydantic import BaseModel, ConfigDict
 
 from app.infrastructure.models.user import UserEntity
 from app.infrastructure.security.password_manager import IPasswordManager
@@ -12,14 +14,16 @@ class UserBase(BaseModel):
 class UserCreate(UserBase):
     password: str
 
-    def to_entity(self, password_manager: IPasswordManager) -> UserEntity:
+    async def to_entity(self, password_manager: IPasswordManager) -> UserEntity:
+        return self.to_entity_with_hashed_password(await password_manager.hash_password_async(self.password))
+
+    def to_entity_with_hashed_password(self, hashed_password: str) -> UserEntity:
         return UserEntity(
             email=self.email,
-            password=self.password,
             username=self.username,
             is_active=True,
             is_superuser=False,
-            password_manager=password_manager,
+            hashed_password=hashed_password,
         )
 
 
@@ -34,5 +38,18 @@ class User(UserBase):
     is_active: bool
     is_superuser: bool
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+class UserImportResult(BaseModel):
+    index: int
+    status: Literal["created", "conflict", "invalid"]
+    id: int | None = None
+    detail: str | None = None
+
+
+class UserImportSummary(BaseModel):
+    created: int
+    conflicts: int
+    invalid: int
+    results: list[UserImportResult]
@@ -1,5 +1,6 @@
 import json
 import os
+from typing import Literal
 
 from dotenv import load_dotenv
 from pydantic import Field
@@ -12,9 +13,43 @@ class Settings(BaseSettings):
     app_name: str = Field(default="FastAPI Sample Project")
     debug: bool = Field(default=False)
     database_url: str = Field(default="sqlite+aiosqlite:///./test.db")
+    database_replica_urls: list[str] = Field(default_factory=list)
+    database_replica_strategy: Literal["round_robin", "least_connections"] = Field(default="round_robin")
+    database_replica_retry_seconds: float = Field(default=30.0)
+    read_your_writes_seconds: float = Field(default=5.0)
+    db_pool: Literal["queue", "null"] | None = Field(default=None)
+    db_pool_size: int | None = Field(default=None)
+    db_max_overflow: int | None = Field(default=None)
+    db_pool_timeout: float | None = Field(default=None)
+    db_pool_recycle: int | None = Field(default=None)
+    db_pool_pre_ping: bool | None = Field(default=None)
+    db_pool_warmup: int = Field(default=0)
+    # "performance" applies to SQLite files only: WAL and tuned pragmas, one writer connection and a reader pool
+    sqlite_profile: Literal["default", "performance"] = Field(default="default")
+    sqlite_mmap_size: int = Field(default=256 * 1024 * 1024)
+    sqlite_cache_size_kib: int = Field(default=64 * 1024)
+    sqlite_busy_timeout_ms: int = Field(default=5000)
+    shutdown_drain_timeout_seconds: float = Field(default=10.0)
     secret_key: str = Field(default="your_secret_key")
     algorithm: str = Field(default="HS256")
     access_token_expire_minutes: int = Field(default=30)
+    token_claims_cache_size: int = Field(default=0)
+    token_claims_cache_ttl_seconds: float = Field(default=300.0)
+    user_cache_size: int = Field(default=0)
+    user_cache_ttl_seconds: float = Field(default=60.0)
+    user_batch_loading: bool = Field(default=False)
+    user_batch_window_seconds: float = Field(default=0.0)
+    user_batch_max_size: int = Field(default=100)
+    user_import_batch_size: int = Field(default=500)
+    fast_json_responses: bool = Field(default=False)
+    metrics_enabled: bool = Field(default=True)
+    metrics_path: str = Field(default="/metrics")
+    metrics_anonymous: bool = Field(default=True)
+    metrics_multiprocess_dir: str | None = Field(default=None)
+    metrics_flush_interval_seconds: float = Field(default=5.0)
+    password_hashing_executor: Literal["thread", "process"] = Field(default="thread")
+    password_hashing_workers: int = Field(default=4)
+    password_hashing_max_queue_size: int = Field(default=64)
 
 
 def load_settings() -> Settings:
@@ -0,0 +1,43 @@
+"""Compares two benchmark result files written by ``benchmarks.suite``.
+
+Run with ``python -m benchmarks.compare before.json after.json``. Changes beyond ``--threshold``
+percent are marked as faster or slower, taking into account whether higher values are better.
+"""
+
+import argparse
+
+from benchmarks.harness import load_results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=5.0, help="percent change reported as a difference")
+    args = parser.parse_args()
+
+    baseline = load_results(args.baseline)
+    candidate = load_results(args.candidate)
+    print(f"baseline:  {baseline.get('revision')} ({baseline.get('database')})")
+    print(f"candidate: {candidate.get('revision')} ({candidate.get('database')})")
+
+    for name, before in baseline["results"].items():
+        after = candidate["results"].get(name)
+        if after is None:
+            print(f"{name:<45} missing in candidate")
+            continue
+
+        change = (after["value"] - before["value"]) / before["value"] * 100 if before["value"] else 0.0
+        improved = change > 0 if before["higher_is_better"] else change < 0
+        verdict = "" if abs(change) < args.threshold else ("faster" if improved else "SLOWER")
+        print(
+            f"{name:<45} {before['value']:14,.2f} -> {after['value']:14,.2f} {before['unit']:<6} "
+            f"{change:+7.1f}% {verdict}"
+        )
+
+    for name in candidate["results"].keys() - baseline["results"].keys():
+        print(f"{name:<45} new in candidate")
+
+
+if __name__ == "__main__":
+    main()
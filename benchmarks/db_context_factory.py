@@ -0,0 +1,56 @@
+"""Per-context cost of DbContextFactory.create_db_context.
+
+Compares the previous behaviour (a new engine variant and session maker on every call)
+with the cached session makers. Run with ``python -m benchmarks.db_context_factory``.
+"""
+
+import asyncio
+import time
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+
+from app.infrastructure.db.db_context import DbContext
+from app.infrastructure.db.db_context_factory import DbContextFactory
+from app.infrastructure.db.isolation_level import IsolationLevel
+
+ITERATIONS = 20_000
+
+
+class LegacyDbContextFactory(DbContextFactory):
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+
+    @asynccontextmanager
+    async def create_db_context(
+        self, isolation_level=IsolationLevel.READ_COMMITTED, autosave: bool = False
+    ) -> AsyncGenerator[DbContext, None]:
+        new_engine = self.engine.execution_options(isolation_level=isolation_level.value)
+        async_session_maker = async_sessionmaker(bind=new_engine, expire_on_commit=False, autocommit=False)
+        db_context = DbContext(async_session_maker(), autosave=autosave)
+        await db_context.__aenter__()
+        try:
+            yield db_context
+        finally:
+            await db_context.__aexit__(None, None, None)
+
+
+async def measure(factory: DbContextFactory) -> float:
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        async with factory.create_db_context(IsolationLevel.SERIALIZABLE):
+            pass
+    return (time.perf_counter() - start) / ITERATIONS
+
+
+async def main() -> None:
+    engine = create_async_engine("sqlite+aiosqlite://")
+    for name, factory in (("legacy", LegacyDbContextFactory(engine)), ("cached", DbContextFactory(engine))):
+        per_context = await measure(factory)
+        print(f"{name:>8}: {per_context * 1e6:8.2f} us/context")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
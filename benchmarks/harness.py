@@ -0,0 +1,221 @@
+"""Shared helpers for the benchmarks: timing loops, percentiles, an in-process ASGI client and JSON results."""
+
+import asyncio
+import json
+import platform
+import statistics
+import subprocess
+import time
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import AsyncIterator, Awaitable, Callable
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    value: float
+    unit: str
+    higher_is_better: bool = True
+    details: dict[str, float] = field(default_factory=dict)
+
+
+def percentile(samples: list[float], percent: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    rank = (len(ordered) - 1) * percent / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def measure_sync(name: str, func: Callable[[], object], iterations: int, rounds: int = 5) -> BenchmarkResult:
+    func()
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        timings.append((time.perf_counter() - start) / iterations)
+    return _ops_result(name, timings)
+
+
+async def measure_async(
+    name: str, func: Callable[[], Awaitable[object]], iterations: int, rounds: int = 5
+) -> BenchmarkResult:
+    await func()
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            await func()
+        timings.append((time.perf_counter() - start) / iterations)
+    return _ops_result(name, timings)
+
+
+def _ops_result(name: str, timings: list[float]) -> BenchmarkResult:
+    # the best round is the least disturbed by the rest of the machine; the median shows the spread
+    best = min(timings)
+    return BenchmarkResult(
+        name=name,
+        value=1 / best,
+        unit="ops/s",
+        details={"best_us": best * 1e6, "median_us": statistics.median(timings) * 1e6},
+    )
+
+
+@dataclass
+class AsgiResponse:
+    status: int
+    headers: list[tuple[bytes, bytes]]
+    body: bytes
+
+
+class AsgiClient:
+    """Calls an ASGI app directly, without sockets or an HTTP client library."""
+
+    def __init__(self, app: Callable, headers: dict[str, str] | None = None) -> None:
+        self.app = app
+        self.headers = [(key.lower().encode(), value.encode()) for key, value in (headers or {}).items()]
+
+    async def request(
+        self, method: str, path: str, query_string: str = "", body: bytes = b"", headers: dict[str, str] | None = None
+    ) -> AsgiResponse:
+        request_headers = [(b"host", b"bench"), *self.headers]
+        request_headers += [(key.lower().encode(), value.encode()) for key, value in (headers or {}).items()]
+        if body:
+            request_headers.append((b"content-length", str(len(body)).encode()))
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query_string.encode(),
+            "root_path": "",
+            "headers": request_headers,
+            "client": ("127.0.0.1", 1),
+            "server": ("bench", 80),
+        }
+
+        disconnected = asyncio.Event()
+        request_sent = False
+        status = 0
+        response_headers: list[tuple[bytes, bytes]] = []
+        chunks: list[bytes] = []
+
+        async def receive() -> dict:
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message: dict) -> None:
+            nonlocal status, response_headers
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_headers = message.get("headers", [])
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    disconnected.set()
+
+        await self.app(scope, receive, send)
+        return AsgiResponse(status, response_headers, b"".join(chunks))
+
+
+@asynccontextmanager
+async def lifespan(app: Callable) -> AsyncIterator[None]:
+    """Runs the ASGI lifespan startup before the block and the shutdown after it, as a server would."""
+    messages: asyncio.Queue[dict] = asyncio.Queue()
+    events = {"lifespan.startup.complete": asyncio.Event(), "lifespan.shutdown.complete": asyncio.Event()}
+
+    async def send(message: dict) -> None:
+        if message["type"] in ("lifespan.startup.failed", "lifespan.shutdown.failed"):
+            raise RuntimeError(message.get("message", message["type"]))
+        events[message["type"]].set()
+
+    task = asyncio.create_task(app({"type": "lifespan", "asgi": {"version": "3.0"}, "state": {}}, messages.get, send))
+    await messages.put({"type": "lifespan.startup"})
+    await _wait_for(events["lifespan.startup.complete"], task)
+    try:
+        yield
+    finally:
+        await messages.put({"type": "lifespan.shutdown"})
+        await _wait_for(events["lifespan.shutdown.complete"], task)
+
+
+async def _wait_for(event: asyncio.Event, task: asyncio.Task) -> None:
+    waiter = asyncio.create_task(event.wait())
+    await asyncio.wait((waiter, task), return_when=asyncio.FIRST_COMPLETED)
+    if not event.is_set():
+        waiter.cancel()
+        task.result()
+        raise RuntimeError("the application finished the lifespan without completing it")
+
+
+async def run_load(
+    name: str,
+    make_request: Callable[[int], Awaitable[AsgiResponse]],
+    requests: int,
+    concurrency: int,
+    expected_status: int = 200,
+) -> list[BenchmarkResult]:
+    """Sends ``requests`` calls from ``concurrency`` workers and reports throughput and latency percentiles."""
+    latencies: list[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker() -> None:
+        nonlocal errors
+        for index in counter:
+            start = time.perf_counter()
+            response = await make_request(index)
+            latencies.append(time.perf_counter() - start)
+            if response.status != expected_status:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    details = {"requests": float(requests), "concurrency": float(concurrency), "errors": float(errors)}
+    results = [BenchmarkResult(f"{name}.rps", requests / elapsed, "req/s", details=details)]
+    for percent in (50, 95, 99):
+        results.append(
+            BenchmarkResult(f"{name}.p{percent}", percentile(latencies, percent) * 1e3, "ms", higher_is_better=False)
+        )
+    return results
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(path: str, results: list[BenchmarkResult], **metadata: object) -> None:
+    document = {
+        "revision": git_revision(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        **metadata,
+        "results": {result.name: asdict(result) for result in results},
+    }
+    with open(path, "w") as file:
+        json.dump(document, file, indent=2)
+
+
+def load_results(path: str) -> dict:
+    with open(path, "r") as file:
+        return json.load(file)
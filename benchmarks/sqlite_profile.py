@@ -0,0 +1,109 @@
+"""Write and read throughput of a SQLite file with the default and the "performance" profile.
+
+Concurrent signups (one INSERT and commit each) and concurrent single-user reads run on their own, then
+together. Last, bulk imports, which read before they write in one transaction, run concurrently: with
+deferred transactions these fail with "database is locked" when another writer commits in between.
+Failed operations are counted rather than retried.
+Run with ``python -m benchmarks.sqlite_profile``.
+"""
+
+import asyncio
+import os
+import random
+import tempfile
+import time
+from typing import Awaitable
+
+from sqlalchemy.exc import OperationalError
+
+from app.infrastructure.db.db_context_factory import DbContextFactory
+from app.infrastructure.db.engine import PoolOptions, create_engine
+from app.infrastructure.db.sqlite import SqliteOptions, create_sqlite_engines
+from app.infrastructure.models import Base, UserEntity
+from app.infrastructure.services.user_service import UserService
+
+WRITES = 2_000
+READS = 10_000
+IMPORTS = 640
+IMPORT_BATCH_SIZE = 5
+CONCURRENCY = 32
+
+
+async def run(name: str, database_url: str) -> None:
+    pool_options = PoolOptions.for_url(database_url)
+    if name == "performance":
+        engine, read_engine = create_sqlite_engines(database_url, pool_options, SqliteOptions())
+        engines = [engine, read_engine]
+        factory = DbContextFactory(engine, read_engine=read_engine)
+    else:
+        engine = create_engine(database_url, pool_options)
+        engines = [engine]
+        factory = DbContextFactory(engine)
+
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    user_service = UserService()
+    counter = iter(range(WRITES * 2 + IMPORTS * IMPORT_BATCH_SIZE))
+    errors = {"write": 0, "read": 0, "import": 0}
+
+    async def write(count: int) -> None:
+        for _, index in zip(range(count), counter):
+            user = UserEntity(username=f"user{index}", email=f"user{index}@example.com", hashed_password="x")
+            try:
+                async with factory.create_db_context() as db_context:
+                    await user_service.create_user(user, db_context)
+            except OperationalError:
+                errors["write"] += 1
+
+    async def read(count: int, randomizer: random.Random) -> None:
+        for _ in range(count):
+            try:
+                async with factory.create_db_context(read_only=True, autocommit=True) as db_context:
+                    await user_service.get_user_summary(randomizer.randint(1, WRITES), db_context)
+            except OperationalError:
+                errors["read"] += 1
+
+    async def import_users(count: int) -> None:
+        for _ in range(count):
+            users = [
+                UserEntity(username=f"user{index}", email=f"user{index}@example.com", hashed_password="x")
+                for _, index in zip(range(IMPORT_BATCH_SIZE), counter)
+            ]
+            try:
+                async with factory.create_db_context() as db_context:
+                    await user_service.import_users(users, db_context)
+            except OperationalError:
+                errors["import"] += 1
+
+    async def timed(*tasks: Awaitable[None]) -> float:
+        start = time.perf_counter()
+        await asyncio.gather(*tasks)
+        return time.perf_counter() - start
+
+    writes_alone = await timed(*(write(WRITES // CONCURRENCY) for _ in range(CONCURRENCY)))
+    reads_alone = await timed(*(read(READS // CONCURRENCY, random.Random(seed)) for seed in range(CONCURRENCY)))
+    half = CONCURRENCY // 2
+    writes_mixed, reads_mixed = await asyncio.gather(
+        timed(*(write(WRITES // half) for _ in range(half))),
+        timed(*(read(READS // half, random.Random(seed)) for seed in range(half))),
+    )
+    imports = await timed(*(import_users(IMPORTS // CONCURRENCY) for _ in range(CONCURRENCY)))
+
+    print(
+        f"{name:>12}: alone {WRITES / writes_alone:7,.0f} writes/s {READS / reads_alone:7,.0f} reads/s, "
+        f"mixed {WRITES / writes_mixed:7,.0f} writes/s {READS / reads_mixed:7,.0f} reads/s, "
+        f"imports {IMPORTS / imports:5,.0f}/s, errors {errors['write']} writes / {errors['read']} reads / "
+        f"{errors['import']} imports"
+    )
+    for target in engines:
+        await target.dispose()
+
+
+async def main() -> None:
+    for name in ("default", "performance"):
+        with tempfile.TemporaryDirectory() as directory:
+            await run(name, f"sqlite+aiosqlite:///{os.path.join(directory, 'benchmark.db')}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,65 @@
+"""Worker startup time: importing the application and serving the first response.
+
+Each run starts a fresh interpreter that imports ``app.presentation.main``, runs the ASGI lifespan
+startup and sends one authenticated ``GET /api/users`` against a throwaway SQLite database.
+Run with ``python -m benchmarks.startup``.
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from sqlalchemy import create_engine
+
+from app.infrastructure.models import Base
+
+RUNS = 7
+
+CHILD = """
+import asyncio, json, time
+start = time.perf_counter()
+from app.presentation.main import app
+imported = time.perf_counter()
+from app.presentation.middlewares.permissions import create_access_token
+from benchmarks.harness import AsgiClient, lifespan
+
+async def first_response():
+    token = create_access_token({"sub": "benchmark", "permissions": ["user:read"]})
+    client = AsgiClient(app, {"Authorization": f"Bearer {token}"})
+    async with lifespan(app):
+        started = time.perf_counter()
+        response = await client.request("GET", "/api/users", "limit=1")
+        assert response.status == 200, response.body
+        return started, time.perf_counter()
+
+started, responded = asyncio.run(first_response())
+print(json.dumps({"import": imported - start, "startup": started - imported, "first_response": responded - started,
+                  "total": responded - start}))
+"""
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "startup.db")
+        engine = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(engine)
+        engine.dispose()
+
+        env = {**os.environ, "ENV": "benchmark", "DATABASE_URL": f"sqlite+aiosqlite:///{path}"}
+        runs = []
+        for _ in range(RUNS):
+            output = subprocess.run(
+                [sys.executable, "-W", "ignore", "-c", CHILD], env=env, capture_output=True, text=True, check=True
+            ).stdout
+            runs.append(json.loads(output.strip().splitlines()[-1]))
+
+    for phase in ("import", "startup", "first_response", "total"):
+        timings = [run[phase] * 1e3 for run in runs]
+        print(f"{phase:>15}: median {statistics.median(timings):8.1f} ms  min {min(timings):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
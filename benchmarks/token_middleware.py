@@ -0,0 +1,104 @@
+"""Per-request cost of the authentication middleware.
+
+Drives a minimal Starlette app directly through ASGI (no HTTP client) once with the previous
+``@app.middleware("http")`` token middleware and once with TokenMiddleware.
+Run with ``python -m benchmarks.token_middleware``.
+"""
+
+import asyncio
+import time
+from typing import Callable
+
+from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse
+from starlette.applications import Starlette
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import PlainTextResponse, Response
+from starlette.routing import Route
+
+from app.presentation.middlewares.permissions import TokenMiddleware, create_access_token, verify_token
+
+ITERATIONS = 10_000
+
+
+async def legacy_token_middleware(request: Request, call_next: Callable) -> Response:
+    try:
+        if request.url.path in ["/docs", "/openapi.json"]:
+            return await call_next(request)
+
+        authorization: str | None = request.headers.get("Authorization")
+        if authorization is None:
+            raise HTTPException(status_code=403, detail="Authorization header missing")
+
+        token = authorization.split(" ")[1] if len(authorization.split(" ")) == 2 else None
+        if token is None:
+            raise HTTPException(status_code=403, detail="Invalid Authorization header format")
+
+        verify_token(token)
+        request.state.token = token
+        return await call_next(request)
+    except HTTPException as exc:
+        return JSONResponse(content={"detail": exc.detail}, status_code=exc.status_code)
+
+
+async def endpoint(request: Request) -> Response:
+    return PlainTextResponse("ok")
+
+
+def build_app(legacy: bool) -> Starlette:
+    app = Starlette(routes=[Route("/api/users", endpoint)])
+    if legacy:
+        app.add_middleware(BaseHTTPMiddleware, dispatch=legacy_token_middleware)
+    else:
+        app.add_middleware(TokenMiddleware)
+    return app
+
+
+async def measure(app: Starlette, token: str) -> float:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/api/users",
+        "raw_path": b"/api/users",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"bench"), (b"authorization", f"Bearer {token}".encode())],
+        "client": ("127.0.0.1", 1),
+        "server": ("bench", 80),
+    }
+
+    disconnected = asyncio.Event()
+
+    def make_receive() -> Callable:
+        sent = False
+
+        async def receive() -> dict:
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        return receive
+
+    async def send(message: dict) -> None:
+        pass
+
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        await app(dict(scope), make_receive(), send)
+    return (time.perf_counter() - start) / ITERATIONS
+
+
+async def main() -> None:
+    token = create_access_token({"sub": "bench", "permissions": ["user:read"]})
+    for name, app in (("legacy", build_app(legacy=True)), ("asgi", build_app(legacy=False))):
+        print(f"{name:>7}: {await measure(app, token) * 1e6:8.2f} us/request")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
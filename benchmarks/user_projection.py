@@ -0,0 +1,55 @@
+"""Rows per second for the user read path.
+
+Compares loading full UserEntity objects (the previous get_all_users path) with the column
+projection used by UserService, both followed by User.model_validate.
+Run with ``python -m benchmarks.user_projection``.
+"""
+
+import asyncio
+import time
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.infrastructure.db.db_context_factory import DbContextFactory
+from app.infrastructure.db.isolation_level import IsolationLevel
+from app.infrastructure.models import Base, UserEntity
+from app.infrastructure.services.user_service import UserService
+from app.presentation.schemas.user import User
+
+ROWS = 10_000
+ROUNDS = 5
+
+
+async def main() -> None:
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+        await connection.execute(
+            insert(UserEntity),
+            [{"username": f"user{i}", "email": f"user{i}@example.com", "hashed_password": "x"} for i in range(ROWS)],
+        )
+
+    factory = DbContextFactory(engine)
+    user_service = UserService()
+
+    async def entities() -> list[User]:
+        async with factory.create_db_context(IsolationLevel.SERIALIZABLE) as db_context:
+            return [User.model_validate(user) for user in await db_context.users.all()]
+
+    async def projection() -> list[User]:
+        async with factory.create_db_context(IsolationLevel.SERIALIZABLE) as db_context:
+            users = await user_service.get_users_page(db_context, ROWS)
+            return [User.model_validate(user) for user in users]
+
+    for name, read in (("entities", entities), ("projection", projection)):
+        await read()
+        start = time.perf_counter()
+        for _ in range(ROUNDS):
+            assert len(await read()) == ROWS
+        print(f"{name:>10}: {ROWS * ROUNDS / (time.perf_counter() - start):12,.0f} rows/s")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
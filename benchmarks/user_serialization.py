@@ -0,0 +1,56 @@
+"""Cost of serialising a 10k-row user list response.
+
+Serves the same prebuilt UserSummary rows from a minimal FastAPI app through ASGI, once through
+``response_model=list[User]`` (validated by the endpoint and again by FastAPI) and once through the
+RowSerializer fast path used when ``fast_json_responses`` is enabled.
+Run with ``python -m benchmarks.user_serialization``.
+"""
+
+import asyncio
+import time
+
+from fastapi import FastAPI
+
+from app.infrastructure.services.user_service import UserSummary
+from app.presentation import responses
+from app.presentation.responses import RawJSONResponse, RowSerializer
+from app.presentation.schemas.user import User
+from benchmarks.harness import AsgiClient
+
+ROWS = 10_000
+ROUNDS = 20
+
+
+def build_app(rows: list[UserSummary]) -> FastAPI:
+    app = FastAPI()
+    serializer = RowSerializer(User)
+
+    @app.get("/model", response_model=list[User])
+    async def model() -> list[User]:
+        return [User.model_validate(row) for row in rows]
+
+    @app.get("/fast", response_model=list[User])
+    async def fast() -> RawJSONResponse:
+        return RawJSONResponse(serializer.dump_many(rows))
+
+    return app
+
+
+async def main() -> None:
+    rows = [UserSummary(i, f"user{i}", f"user{i}@example.com", True, False, 1) for i in range(ROWS)]
+    client = AsgiClient(build_app(rows))
+
+    bodies = [(await client.request("GET", path)).body for path in ("/model", "/fast")]
+    assert bodies[0] == bodies[1]
+
+    print(f"encoder: {'orjson' if responses.orjson is not None else 'json'}")
+    for path in ("/model", "/fast"):
+        start = time.perf_counter()
+        for _ in range(ROUNDS):
+            await client.request("GET", path)
+        elapsed = (time.perf_counter() - start) / ROUNDS
+        print(f"{path:>7}: {elapsed * 1e3:8.2f} ms/response {ROWS / elapsed:12,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
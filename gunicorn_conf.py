@@ -1,7 +1,49 @@
+import importlib
 import json
+import math
 import multiprocessing
 import os
 
+
+def get_cgroup_cpu_limit() -> float | None:
+    # cgroup v2 ("<quota> <period>" or "max <period>"), then cgroup v1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as file:
+            quota, period = file.read().split()
+        return None if quota == "max" else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as file:
+            quota_us = int(file.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as file:
+            period_us = int(file.read())
+        return quota_us / period_us if quota_us > 0 else None
+    except (OSError, ValueError):
+        return None
+
+
+def uvicorn_auto(module: str, fallback: str) -> str:
+    # uvicorn's "auto" loop and http settings use a module if it imports and fall back otherwise
+    try:
+        importlib.import_module(module)
+    except ImportError:
+        return fallback
+    return module
+
+
+def get_available_cores() -> int:
+    # containers usually see every host CPU, while the CPU quota and affinity say how many they may use
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cores = multiprocessing.cpu_count()
+    cpu_limit = get_cgroup_cpu_limit()
+    if cpu_limit is not None:
+        cores = min(cores, max(math.ceil(cpu_limit), 1))
+    return cores
+
+
 workers_per_core_str = os.getenv("WORKERS_PER_CORE", "1")
 max_workers_str = os.getenv("MAX_WORKERS")
 use_max_workers = None
@@ -18,7 +60,7 @@ if bind_env:
 else:
     use_bind = f"{host}:{port}"
 
-cores = multiprocessing.cpu_count()
+cores = get_available_cores()
 workers_per_core = float(workers_per_core_str)
 default_web_concurrency = workers_per_core * cores
 if web_concurrency_str:
@@ -35,6 +77,12 @@ use_errorlog = errorlog_var or None
 graceful_timeout_str = os.getenv("GRACEFUL_TIMEOUT", "120")
 timeout_str = os.getenv("TIMEOUT", "120")
 keepalive_str = os.getenv("KEEP_ALIVE", "5")
+worker_class_str = os.getenv("WORKER_CLASS", "uvicorn.workers.UvicornWorker")
+# recycling workers bounds slow memory growth; the jitter keeps them from restarting all at once
+max_requests_str = os.getenv("MAX_REQUESTS", "10000")
+max_requests_jitter_str = os.getenv("MAX_REQUESTS_JITTER", None)
+# the app creates engines and pools per worker, so importing it once in the master is safe
+preload_app_str = os.getenv("PRELOAD_APP", "false")
 
 # Gunicorn config variables
 loglevel = use_loglevel
@@ -46,6 +94,26 @@ accesslog = use_accesslog
 graceful_timeout = int(graceful_timeout_str)
 timeout = int(timeout_str)
 keepalive = int(keepalive_str)
+worker_class = worker_class_str
+max_requests = int(max_requests_str)
+if max_requests_jitter_str:
+    max_requests_jitter = int(max_requests_jitter_str)
+else:
+    max_requests_jitter = max_requests // 10
+# UvicornWorker ignores worker_connections, so it is not set. Its loop and http settings are "auto",
+# which these report; they are only logged, not passed to the worker
+uvicorn_loop = uvicorn_auto("uvloop", "asyncio")
+uvicorn_http = uvicorn_auto("httptools", "h11")
+preload_app = preload_app_str.lower() in ("1", "true", "yes")
+
+
+def on_starting(server) -> None:
+    # workers append to the shared metrics directory, so the snapshots of a previous run are removed first
+    from app.infrastructure.metrics.multiprocess import MetricsDirectory
+    from app.presentation.settings import settings
+
+    if settings.metrics_enabled and settings.metrics_multiprocess_dir:
+        MetricsDirectory.clear(settings.metrics_multiprocess_dir)
 
 
 # For debugging and testing
@@ -56,10 +124,18 @@ log_data = {
     "graceful_timeout": graceful_timeout,
     "timeout": timeout,
     "keepalive": keepalive,
+    "preload_app": preload_app,
+    "worker_class": worker_class,
+    "max_requests": max_requests,
+    "max_requests_jitter": max_requests_jitter,
     "errorlog": errorlog,
     "accesslog": accesslog,
     # Additional, non-gunicorn variables
     "workers_per_core": workers_per_core,
+    "cores": cores,
+    "cpu_limit": get_cgroup_cpu_limit(),
+    "uvicorn_loop": uvicorn_loop,
+    "uvicorn_http": uvicorn_http,
     "use_max_workers": use_max_workers,
     "host": host,
     "port": port,
@@ -0,0 +1,34 @@
+"""Add user version
+
+Revision ID: 5d063b562f51
+Revises: 7f5cfc3cdd30
+Create Date: 2026-10-17 09:00:12.418305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d063b562f51'
+down_revision: Union[str, None] = '7f5cfc3cdd30'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # SQLite can only switch to AUTOINCREMENT by copying the table; other databases never reuse ids anyway
+    with op.batch_alter_table('users', table_kwargs={'sqlite_autoincrement': True},
+                              recreate='always' if op.get_bind().dialect.name == 'sqlite' else 'auto') as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+        batch_op.create_index('ix_users_id_version', ['id', 'version'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('users', table_kwargs={'sqlite_autoincrement': False},
+                              recreate='always' if op.get_bind().dialect.name == 'sqlite' else 'auto') as batch_op:
+        batch_op.drop_index('ix_users_id_version')
+        batch_op.drop_column('version')
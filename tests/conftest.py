@@ -0,0 +1,34 @@
+import os
+import tempfile
+
+# the application reads its settings at import time; no settings file exists for this environment,
+# so they come from the variables below and the tracked dev.db is never touched
+os.environ["ENV"] = "test"
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}")
+
+from collections.abc import AsyncIterator  # noqa: E402
+
+import pytest  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine  # noqa: E402
+
+from app.infrastructure.db.db_context_factory import DbContextFactory  # noqa: E402
+from app.infrastructure.models import Base, UserEntity  # noqa: E402
+
+
+@pytest.fixture
+async def engine() -> AsyncIterator[AsyncEngine]:
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+        await connection.execute(
+            insert(UserEntity),
+            [{"username": f"user{i}", "email": f"user{i}@example.com", "hashed_password": "x"} for i in range(1, 4)],
+        )
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+def db_context_factory(engine: AsyncEngine) -> DbContextFactory:
+    return DbContextFactory(engine)
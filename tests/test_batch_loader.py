@@ -0,0 +1,83 @@
+import asyncio
+
+from app.infrastructure.services.batch_loader import BatchLoader
+
+
+class Source:
+    def __init__(self, delay: float = 0.0) -> None:
+        self.delay = delay
+        self.batches: list[list[int]] = []
+
+    async def load(self, keys: list[int]) -> dict[int, str]:
+        self.batches.append(keys)
+        await asyncio.sleep(self.delay)
+        return {key: f"value{key}" for key in keys if key > 0}
+
+
+async def test_keys_of_one_loop_iteration_are_loaded_in_one_batch() -> None:
+    source = Source()
+    loader = BatchLoader("test", source.load)
+
+    results = await asyncio.gather(*(loader.load(key) for key in (1, 2, 2, 0)))
+
+    assert results == ["value1", "value2", "value2", None]
+    assert source.batches == [[1, 2, 0]]
+
+
+async def test_the_window_collects_keys_requested_later() -> None:
+    source = Source()
+    loader = BatchLoader("test", source.load, window_seconds=0.05)
+
+    async def load_later(key: int) -> str | None:
+        await asyncio.sleep(0.01)
+        return await loader.load(key)
+
+    assert await asyncio.gather(loader.load(1), load_later(2)) == ["value1", "value2"]
+    assert source.batches == [[1, 2]]
+
+
+async def test_a_full_batch_is_dispatched_without_waiting_for_the_window() -> None:
+    source = Source()
+    loader = BatchLoader("test", source.load, window_seconds=10, max_batch_size=2)
+
+    results = await asyncio.wait_for(asyncio.gather(*(loader.load(key) for key in (1, 2, 3, 4))), timeout=1)
+
+    assert results == ["value1", "value2", "value3", "value4"]
+    assert source.batches == [[1, 2], [3, 4]]
+
+
+async def test_a_cancelled_caller_does_not_cancel_the_batch() -> None:
+    source = Source(delay=0.02)
+    loader = BatchLoader("test", source.load)
+    cancelled = asyncio.ensure_future(loader.load(1))
+    waiting = asyncio.ensure_future(loader.load(1))
+    await asyncio.sleep(0.01)
+
+    cancelled.cancel()
+
+    assert await waiting == "value1"
+    assert cancelled.cancelled()
+
+
+async def test_batch_errors_reach_every_caller() -> None:
+    async def fail(keys: list[int]) -> dict[int, str]:
+        raise RuntimeError("database is down")
+
+    loader = BatchLoader("test", fail)
+
+    results = await asyncio.gather(loader.load(1), loader.load(2), return_exceptions=True)
+
+    assert [str(result) for result in results] == ["database is down"] * 2
+
+
+async def test_stats_record_batch_sizes_and_latency() -> None:
+    source = Source(delay=0.01)
+    loader = BatchLoader("test", source.load, window_seconds=0.01)
+
+    await asyncio.gather(*(loader.load(key) for key in (1, 2, 3)))
+    await loader.load(4)
+
+    stats = loader.stats
+    assert (stats.batches, stats.keys, stats.max_batch_size, stats.average_batch_size) == (2, 4, 3, 2.0)
+    assert 0.015 <= stats.wait_seconds_total < 0.5
+    assert 0.02 <= stats.duration_seconds_total and 0.01 <= stats.duration_seconds_max < stats.duration_seconds_total
@@ -0,0 +1,30 @@
+import asyncio
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.infrastructure.db.db_context_factory import DbContextFactory
+from app.infrastructure.db.replica_router import ReadConsistency, ReplicaRouter, current_read_consistency
+from app.infrastructure.services.batched_user_service import BatchedUserService
+
+
+async def test_waiting_lookups_hold_no_context(db_context_factory: DbContextFactory) -> None:
+    service = BatchedUserService(db_context_factory, window_seconds=0.02)
+
+    lookups = asyncio.gather(*(service.read_user_summary(user_id, db_context_factory) for user_id in (1, 2, 3, 9)))
+    await asyncio.sleep(0.01)
+    assert db_context_factory.active_contexts == 0
+
+    users = await lookups
+    assert [user.username if user is not None else None for user in users] == ["user1", "user2", "user3", None]
+    assert service.loader.stats.batches == 1
+
+
+async def test_reads_of_own_writes_skip_the_batch(engine: AsyncEngine) -> None:
+    db_context_factory = DbContextFactory(engine, ReplicaRouter([]))
+    service = BatchedUserService(db_context_factory)
+    current_read_consistency.set(ReadConsistency(wrote=True))
+
+    user = await service.read_user_summary(1, db_context_factory)
+
+    assert user.username == "user1"
+    assert service.loader.stats.batches == 0
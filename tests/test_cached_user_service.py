@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app.infrastructure.cache.cache_backend import InMemoryCacheBackend
+from app.infrastructure.db.db_context_factory import DbContextFactory
+from app.infrastructure.models import UserEntity
+from app.infrastructure.services.cached_user_service import CachedUserService
+from app.infrastructure.services.user_service import UserService
+
+
+async def settle() -> None:
+    # invalidations run as tasks scheduled by the commit
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@pytest.fixture
+def service() -> CachedUserService:
+    return CachedUserService(UserService(), InMemoryCacheBackend())
+
+
+async def test_changes_before_a_rolled_back_savepoint_invalidate_the_cache(
+    service: CachedUserService, db_context_factory: DbContextFactory
+) -> None:
+    async with db_context_factory.create_db_context() as db_context:
+        assert (await service.get_user_summary(1, db_context)).email == "user1@example.com"
+
+    async with db_context_factory.create_db_context() as db_context:
+        user = await db_context.users.try_get(1)
+        user.email = "changed@example.com"
+        await db_context.session.flush()
+        with pytest.raises(IntegrityError):
+            async with db_context.savepoint():
+                await db_context.users.add(UserEntity("user2", "user2@example.com", hashed_password="x"))
+        await db_context.save()
+    await settle()
+
+    async with db_context_factory.create_db_context() as db_context:
+        assert (await service.get_user_summary(1, db_context)).email == "changed@example.com"
+
+
+async def test_rolled_back_changes_are_not_published(
+    service: CachedUserService, db_context_factory: DbContextFactory
+) -> None:
+    invalidated: list[int] = []
+    service.invalidate = lambda *user_ids: invalidated.extend(user_ids) or asyncio.sleep(0)  # type: ignore
+
+    with pytest.raises(RuntimeError):
+        async with db_context_factory.create_db_context() as db_context:
+            user = await db_context.users.try_get(1)
+            user.email = "changed@example.com"
+            await db_context.session.flush()
+            raise RuntimeError()
+    await settle()
+
+    async with db_context_factory.create_db_context() as db_context:
+        await db_context.save()
+    await settle()
+    assert invalidated == []
+
+
+async def test_a_cancelled_leader_does_not_cancel_coalesced_waiters(
+    service: CachedUserService, db_context_factory: DbContextFactory
+) -> None:
+    release = asyncio.Event()
+    calls = 0
+    get_user_summary = service.user_service.get_user_summary
+
+    async def slow_get_user_summary(user_id, db_context):
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            await release.wait()
+        return await get_user_summary(user_id, db_context)
+
+    service.user_service.get_user_summary = slow_get_user_summary  # type: ignore
+
+    async def lookup():
+        async with db_context_factory.create_db_context() as db_context:
+            return await service.get_user_summary(1, db_context)
+
+    leader = asyncio.create_task(lookup())
+    await settle()
+    waiter = asyncio.create_task(lookup())
+    await settle()
+    leader.cancel()
+
+    assert (await waiter).username == "user1"
+    assert leader.cancelled()
+    assert calls == 2
@@ -0,0 +1,83 @@
+import asyncio
+from pathlib import Path
+
+import anyio
+import pytest
+from sqlalchemy import text
+
+from app.infrastructure.db.db_context_factory import DbContextFactory
+from app.infrastructure.db.engine import PoolOptions, create_engine
+
+
+@pytest.fixture
+async def single_connection_factory(tmp_path: Path):
+    engine = create_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}", PoolOptions(size=1, max_overflow=0, timeout=1)
+    )
+    yield DbContextFactory(engine)
+    await engine.dispose()
+
+
+async def test_a_cancelled_context_returns_its_connection(single_connection_factory: DbContextFactory) -> None:
+    started = asyncio.Event()
+
+    async def hold_connection() -> None:
+        async with single_connection_factory.create_db_context() as db_context:
+            await db_context.session.execute(text("SELECT 1"))
+            started.set()
+            await asyncio.sleep(10)
+
+    task = asyncio.create_task(hold_connection())
+    await started.wait()
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    async with single_connection_factory.create_db_context() as db_context:
+        assert (await db_context.session.execute(text("SELECT 1"))).scalar() == 1
+
+
+async def test_a_context_closes_inside_a_cancelled_anyio_scope(single_connection_factory: DbContextFactory) -> None:
+    # anyio cancels every await inside a cancelled scope, including the ones that close the session
+    with anyio.CancelScope() as scope:
+        async with single_connection_factory.create_db_context() as db_context:
+            await db_context.session.execute(text("SELECT 1"))
+            scope.cancel()
+            await anyio.sleep(10)
+
+    async with single_connection_factory.create_db_context() as db_context:
+        assert (await db_context.session.execute(text("SELECT 1"))).scalar() == 1
+
+
+async def test_drain_waits_until_a_cancelled_context_is_closed(db_context_factory: DbContextFactory) -> None:
+    closing = asyncio.Event()
+    finish_close = asyncio.Event()
+
+    async def hold_context() -> None:
+        async with db_context_factory.create_db_context() as db_context:
+            close = db_context.session.close
+
+            async def slow_close() -> None:
+                closing.set()
+                await finish_close.wait()
+                await close()
+
+            db_context.session.close = slow_close  # type: ignore
+            await asyncio.sleep(10)
+
+    task = asyncio.create_task(hold_context())
+    await asyncio.sleep(0)
+    task.cancel()
+    await closing.wait()
+    # cancelled again while closing, as anyio does inside a cancelled scope
+    task.cancel()
+    await asyncio.sleep(0)
+    assert db_context_factory.active_contexts == 1
+
+    drain = asyncio.create_task(db_context_factory.drain(timeout=5))
+    await asyncio.sleep(0)
+    assert not drain.done()
+    finish_close.set()
+    assert await drain == 0
+    with pytest.raises(asyncio.CancelledError):
+        await task
@@ -0,0 +1,96 @@
+import asyncio
+
+from sqlalchemy import inspect
+
+from app.infrastructure.cache.cache_backend import InMemoryCacheBackend
+from app.infrastructure.db.db_context_factory import DbContextFactory
+from app.infrastructure.models import UserEntity
+from app.infrastructure.services.cached_user_service import CachedUserService
+from app.infrastructure.services.user_service import UserService
+
+
+async def usernames(db_context_factory: DbContextFactory, *criteria) -> list[str]:
+    async with db_context_factory.create_db_context() as db_context:
+        return [row.username for row in await db_context.users.project((UserEntity.username,), *criteria)]
+
+
+async def test_update_where_returns_the_affected_count_or_ids(db_context_factory: DbContextFactory) -> None:
+    async with db_context_factory.create_db_context() as db_context:
+        assert await db_context.users.update_where(UserEntity.id >= 2, values={"is_active": False}) == 2
+        assert await db_context.users.update_where(UserEntity.id > 3, values={"is_active": False}) == 0
+        ids = await db_context.users.update_where(
+            or_conditions=[UserEntity.id == 1, UserEntity.username == "user3"], values={"is_superuser": True},
+            return_ids=True,
+        )
+        assert sorted(ids) == [1, 3]
+        await db_context.save()
+
+    assert await usernames(db_context_factory, UserEntity.is_active.is_(False)) == ["user2", "user3"]
+    assert await usernames(db_context_factory, UserEntity.is_superuser.is_(True)) == ["user1", "user3"]
+
+
+async def test_update_where_raises_the_version(db_context_factory: DbContextFactory) -> None:
+    async with db_context_factory.create_db_context() as db_context:
+        await db_context.users.update_where(UserEntity.id == 1, values={"is_active": False})
+        await db_context.save()
+
+    async with db_context_factory.create_db_context() as db_context:
+        rows = await db_context.users.project((UserEntity.id, UserEntity.version), order_by=UserEntity.id)
+    assert [tuple(row) for row in rows] == [(1, 2), (2, 1), (3, 1)]
+
+
+async def test_update_where_synchronises_loaded_entities(db_context_factory: DbContextFactory) -> None:
+    async with db_context_factory.create_db_context() as db_context:
+        user = await db_context.users.try_get(1)
+        await db_context.users.update_where(UserEntity.id == 1, values={"email": "changed@example.com"})
+        assert (user.email, user.version) == ("changed@example.com", 2)
+
+        # the next ORM update of the entity expects the version the bulk update left
+        user.is_active = False
+        await db_context.save()
+
+    async with db_context_factory.create_db_context() as db_context:
+        user = await db_context.users.try_get(1)
+    assert (user.email, user.is_active, user.version) == ("changed@example.com", False, 3)
+
+
+async def test_delete_where_returns_the_deleted_ids_and_detaches_loaded_entities(
+    db_context_factory: DbContextFactory,
+) -> None:
+    async with db_context_factory.create_db_context() as db_context:
+        user = await db_context.users.try_get(2)
+        assert await db_context.users.delete_where(UserEntity.id == 2, return_ids=True) == [2]
+        assert inspect(user).was_deleted
+        assert await db_context.users.try_get(2) is None
+        assert await db_context.users.delete_where(UserEntity.id > 2) == 1
+        await db_context.save()
+
+    assert await usernames(db_context_factory) == ["user1"]
+
+
+async def test_bulk_changes_invalidate_cached_users_once_committed(db_context_factory: DbContextFactory) -> None:
+    service = CachedUserService(UserService(), InMemoryCacheBackend())
+
+    async def cached_email(user_id: int) -> str | None:
+        async with db_context_factory.create_db_context() as db_context:
+            user = await service.get_user_summary(user_id, db_context)
+        return user.email if user is not None else None
+
+    async def settle() -> None:
+        # invalidations run as tasks scheduled by the commit
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+    assert [await cached_email(1), await cached_email(2)] == ["user1@example.com", "user2@example.com"]
+
+    async with db_context_factory.create_db_context() as db_context:
+        await db_context.users.update_where(UserEntity.id == 1, values={"email": "rolled-back@example.com"})
+    await settle()
+    assert await cached_email(1) == "user1@example.com"
+
+    async with db_context_factory.create_db_context() as db_context:
+        await db_context.users.update_where(UserEntity.id == 1, values={"email": "changed@example.com"})
+        await db_context.users.delete_where(UserEntity.id == 2)
+        await db_context.save()
+    await settle()
+    assert [await cached_email(1), await cached_email(2)] == ["changed@example.com", None]
@@ -0,0 +1,80 @@
+import asyncio
+import os
+from pathlib import Path
+
+from app.infrastructure.metrics.metrics import MetricsRegistry
+from app.infrastructure.metrics.multiprocess import MetricsDirectory
+
+
+class Worker:
+    def __init__(self, path: Path, pid: int, in_flight: float) -> None:
+        self.registry = MetricsRegistry()
+        self.requests = self.registry.counter("requests_total", "Requests", ("route",))
+        self.latency = self.registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+        self.registry.gauge("in_flight", "In flight", lambda: in_flight)
+        self.directory = MetricsDirectory(self.registry, str(path), flush_interval_seconds=1.0)
+        # the processes of a gunicorn deployment, simulated in one
+        self.directory.worker = str(pid)
+        self.directory.name = f"{pid}-0"
+
+
+def samples(exposition: str) -> dict[str, str]:
+    return dict(line.rsplit(" ", 1) for line in exposition.splitlines() if not line.startswith("#"))
+
+
+async def test_a_scrape_sums_counters_and_histograms_of_all_workers(tmp_path: Path) -> None:
+    first, second = Worker(tmp_path, 101, in_flight=2), Worker(tmp_path, 102, in_flight=3)
+    first.requests.inc(labels=("/users",))
+    first.latency.observe(0.05)
+    second.requests.inc(2, labels=("/users",))
+    second.requests.inc(labels=("/public",))
+    second.latency.observe(0.5)
+    await second.directory.flush()
+
+    exposition = await first.directory.render()
+
+    assert samples(exposition) == {
+        'requests_total{route="/users"}': "3",
+        'requests_total{route="/public"}': "1",
+        'latency_seconds_bucket{le="0.1"}': "1",
+        'latency_seconds_bucket{le="1"}': "2",
+        'latency_seconds_bucket{le="+Inf"}': "2",
+        "latency_seconds_sum": "0.55",
+        "latency_seconds_count": "2",
+        'in_flight{worker="101"}': "2",
+        'in_flight{worker="102"}': "3",
+    }
+    assert exposition.count("# TYPE requests_total counter") == 1
+
+
+async def test_exited_workers_keep_their_totals_but_not_their_gauges(tmp_path: Path) -> None:
+    first, exited = Worker(tmp_path, 101, in_flight=2), Worker(tmp_path, 102, in_flight=3)
+    exited.requests.inc(5, labels=("/users",))
+    task = asyncio.create_task(exited.directory.run())
+    await asyncio.sleep(0)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    snapshot = tmp_path / "102-0.json"
+    os.utime(snapshot, (0, 0))
+
+    result = samples(await first.directory.render())
+
+    assert result['requests_total{route="/users"}'] == "5"
+    assert 'in_flight{worker="102"}' not in result
+    assert result['in_flight{worker="101"}'] == "2"
+
+
+async def test_unreadable_snapshots_are_skipped(tmp_path: Path) -> None:
+    worker = Worker(tmp_path, 101, in_flight=1)
+    (tmp_path / "102-0.json").write_text('{"requests_total": ')
+
+    assert samples(await worker.directory.render()) == {'in_flight{worker="101"}': "1"}
+
+
+def test_clear_removes_the_snapshots_of_a_previous_run(tmp_path: Path) -> None:
+    (tmp_path / "101-0.json").write_text("{}")
+    (tmp_path / "notes.txt").write_text("kept")
+
+    MetricsDirectory.clear(str(tmp_path))
+
+    assert [path.name for path in tmp_path.iterdir()] == ["notes.txt"]
@@ -0,0 +1,42 @@
+import asyncio
+import time
+
+import pytest
+
+from app.infrastructure.security import password_manager as password_manager_module
+from app.infrastructure.security.password_manager import PasswordManager
+
+
+@pytest.fixture
+def fast_hash(monkeypatch: pytest.MonkeyPatch) -> None:
+    def hash_password(password: str) -> str:
+        time.sleep(0.01)
+        return f"hashed:{password}"
+
+    monkeypatch.setattr(password_manager_module, "_hash_password", hash_password)
+
+
+async def test_concurrent_bulk_hashing_leaves_the_queue_to_interactive_calls(fast_hash: None) -> None:
+    manager = PasswordManager(max_workers=2, max_queue_size=2)
+    peak = 0
+
+    async def watch() -> None:
+        nonlocal peak
+        while True:
+            peak = max(peak, manager.in_flight)
+            await asyncio.sleep(0.001)
+
+    watcher = asyncio.create_task(watch())
+    bulk = [asyncio.create_task(manager.hash_passwords_async([f"p{i}" for i in range(10)])) for _ in range(3)]
+    await asyncio.sleep(0.005)
+
+    # fails with PasswordManagerOverloadedError if the bulk calls hold the whole queue
+    interactive = await asyncio.gather(*(manager.hash_password_async("interactive") for _ in range(2)))
+
+    results = await asyncio.gather(*bulk)
+    watcher.cancel()
+    manager.shutdown()
+
+    assert interactive == ["hashed:interactive"] * 2
+    assert results[0] == [f"hashed:p{i}" for i in range(10)]
+    assert peak <= manager.max_workers + manager.max_queue_size
@@ -0,0 +1,106 @@
+from collections.abc import AsyncIterator
+
+import httpx
+import jwt
+import pytest
+from fastapi import FastAPI, Request
+
+from app.infrastructure.security.token_claims_cache import TokenClaimsCache
+from app.presentation.middlewares import permissions
+from app.presentation.middlewares.permissions import TokenMiddleware, create_access_token, require_permissions
+from app.presentation.settings import settings
+
+reports = FastAPI()
+reports.add_middleware(TokenMiddleware)
+
+
+@reports.get("/reports")
+@require_permissions(["report:read"])
+async def read_reports(request: Request) -> str:
+    return "read"
+
+
+@reports.post("/reports")
+@require_permissions(["report:read", "report:write"])
+async def write_report(request: Request) -> str:
+    return "written"
+
+
+@pytest.fixture(params=["without claims cache", "with claims cache"])
+async def client(request: pytest.FixtureRequest, monkeypatch: pytest.MonkeyPatch) -> AsyncIterator[httpx.AsyncClient]:
+    cache = TokenClaimsCache() if request.param == "with claims cache" else None
+    monkeypatch.setattr(permissions, "token_claims_cache", cache)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=reports), base_url="http://test") as client:
+        yield client
+
+
+def bearer(*granted: str) -> dict[str, str]:
+    return {"Authorization": f"Bearer {create_access_token({'sub': 'tester', 'permissions': list(granted)})}"}
+
+
+async def test_granted_permissions_allow_the_route(client: httpx.AsyncClient) -> None:
+    headers = bearer("report:read", "report:write")
+    # twice with the same token, so the second request is answered from the claims cache when it is enabled
+    for _ in range(2):
+        assert (await client.get("/reports", headers=headers)).status_code == 200
+        assert (await client.post("/reports", headers=headers)).status_code == 200
+
+
+async def test_a_missing_permission_is_forbidden(client: httpx.AsyncClient) -> None:
+    headers = bearer("report:read")
+    for _ in range(2):
+        assert (await client.get("/reports", headers=headers)).status_code == 200
+        response = await client.post("/reports", headers=headers)
+        assert response.status_code == 403
+        assert response.json() == {"detail": "Permission denied"}
+
+
+async def test_extra_and_unregistered_permissions_grant_nothing(client: httpx.AsyncClient) -> None:
+    headers = bearer("report:write", "report:admin", "*")
+    for _ in range(2):
+        assert (await client.get("/reports", headers=headers)).status_code == 403
+        assert (await client.post("/reports", headers=headers)).status_code == 403
+    assert permissions.permission_registry.mask(["report:admin", "*"]) == 0
+
+
+@pytest.mark.parametrize(
+    "token",
+    [
+        create_access_token({"sub": "tester", "permissions": 5}),
+        create_access_token({"sub": "tester", "permissions": "report:read"}),
+        create_access_token({"sub": "tester", "permissions": ["report:read", 5]}),
+        jwt.encode({"sub": "tester", "permissions": ["report:read"]}, settings.secret_key, settings.algorithm),
+    ],
+    ids=["number", "string", "non-string item", "without exp"],
+)
+async def test_malformed_claims_are_invalid_tokens(client: httpx.AsyncClient, token: str) -> None:
+    response = await client.get("/reports", headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == 401
+    assert response.json() == {"detail": "Invalid token"}
+
+
+async def test_openapi_shows_the_required_permissions_as_scopes() -> None:
+    from app.presentation.main import app
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        schema = (await client.get("/openapi.json")).json()
+
+    assert schema["components"]["securitySchemes"]["bearerAuth"] == {
+        "type": "http",
+        "scheme": "bearer",
+        "bearerFormat": "JWT",
+    }
+    assert schema["security"] == [{"bearerAuth": []}]
+    security = {
+        (method, path): operation["security"]
+        for path, operations in schema["paths"].items()
+        for method, operation in operations.items()
+    }
+    assert security == {
+        ("post", "/api/users"): [{"bearerAuth": ["user:create"]}],
+        ("post", "/api/users/bulk"): [{"bearerAuth": ["user:create"]}],
+        ("get", "/api/users/{user_id}"): [{"bearerAuth": ["user:read"]}],
+        ("get", "/api/users"): [{"bearerAuth": ["user:read"]}],
+        ("get", "/api/public"): [],
+    }
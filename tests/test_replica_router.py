@@ -0,0 +1,133 @@
+import time
+from collections.abc import AsyncIterator
+from pathlib import Path
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from app.infrastructure.db.db_context_factory import DbContextFactory
+from app.infrastructure.db.replica_router import (
+    ReadConsistency,
+    ReplicaRouter,
+    ReplicaStrategy,
+    current_read_consistency,
+)
+from app.infrastructure.models import Base, UserEntity
+from app.presentation.middlewares.permissions import TokenMiddleware, create_access_token
+
+
+@pytest.fixture
+async def databases(tmp_path: Path) -> AsyncIterator[dict[str, AsyncEngine]]:
+    # every database names itself in the username of user 1, so a read shows which one served it
+    names = ("primary", "replica1", "replica2")
+    engines = {name: create_async_engine(f"sqlite+aiosqlite:///{tmp_path / name}.db") for name in names}
+    for name, engine in engines.items():
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+            await connection.execute(insert(UserEntity), [{"username": name, "email": name, "hashed_password": "x"}])
+    yield engines
+    for engine in engines.values():
+        await engine.dispose()
+
+
+def create_factory(
+    databases: dict[str, AsyncEngine], strategy: ReplicaStrategy = "round_robin", *replicas: AsyncEngine
+) -> DbContextFactory:
+    router = ReplicaRouter(replicas or (databases["replica1"], databases["replica2"]), strategy=strategy)
+    return DbContextFactory(databases["primary"], router)
+
+
+async def read(factory: DbContextFactory) -> str:
+    async with factory.create_db_context(read_only=True) as db_context:
+        return (await db_context.users.try_project_first((UserEntity.username,), UserEntity.id == 1)).username
+
+
+async def test_round_robin_alternates_between_replicas(databases: dict[str, AsyncEngine]) -> None:
+    factory = create_factory(databases)
+    assert [await read(factory) for _ in range(4)] == ["replica1", "replica2", "replica1", "replica2"]
+
+
+async def test_least_connections_avoids_the_busy_replica(databases: dict[str, AsyncEngine]) -> None:
+    factory = create_factory(databases, "least_connections")
+
+    async with factory.create_db_context(read_only=True) as db_context:
+        assert (await db_context.users.try_get(1)).username == "replica1"
+        assert [await read(factory) for _ in range(2)] == ["replica2", "replica2"]
+    assert await read(factory) == "replica1"
+
+
+async def test_unreachable_replicas_fall_back_to_the_others_and_then_to_the_primary(
+    databases: dict[str, AsyncEngine], tmp_path: Path
+) -> None:
+    unreachable = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    factory = create_factory(databases, "round_robin", unreachable, databases["replica2"])
+
+    assert [await read(factory) for _ in range(3)] == ["replica2", "replica2", "replica2"]
+    assert factory.replica_router.healthy_count() == 1
+
+    factory.replica_router.mark_unhealthy(databases["replica2"])
+    assert await read(factory) == "primary"
+    await unreachable.dispose()
+
+
+async def test_reads_after_a_committed_write_go_to_the_primary(databases: dict[str, AsyncEngine]) -> None:
+    factory = create_factory(databases)
+    current_read_consistency.set(ReadConsistency(client_key="client"))
+
+    # contexts that write nothing, or roll their writes back, leave the reads on the replicas
+    async with factory.create_db_context() as db_context:
+        await db_context.users.try_get(1)
+        await db_context.save()
+    with pytest.raises(RuntimeError):
+        async with factory.create_db_context() as db_context:
+            await db_context.users.add(UserEntity("new", "new", hashed_password="x"))
+            raise RuntimeError()
+    assert await read(factory) == "replica1"
+
+    async with factory.create_db_context() as db_context:
+        await db_context.users.update_where(UserEntity.id == 1, values={"is_active": False})
+        await db_context.save()
+    assert await read(factory) == "primary"
+
+    # later requests of the same client, but not those of others
+    current_read_consistency.set(ReadConsistency(client_key="client"))
+    assert await read(factory) == "primary"
+    current_read_consistency.set(ReadConsistency(client_key="other"))
+    assert await read(factory) == "replica2"
+
+
+async def test_a_reported_last_write_keeps_reads_on_the_primary_in_any_worker(
+    databases: dict[str, AsyncEngine]
+) -> None:
+    factory = create_factory(databases)
+
+    current_read_consistency.set(ReadConsistency(last_write_at=time.time() - 1))
+    assert await read(factory) == "primary"
+    current_read_consistency.set(ReadConsistency(last_write_at=time.time() - 60))
+    assert await read(factory) == "replica1"
+
+
+async def test_the_last_write_cookie_reaches_other_workers() -> None:
+    app = FastAPI()
+    app.add_middleware(TokenMiddleware)
+
+    @app.post("/write")
+    async def write() -> None:
+        ReplicaRouter([]).record_write()
+
+    @app.get("/read")
+    async def read_primary() -> bool:
+        # a router of another worker, which has not seen the write itself
+        return ReplicaRouter([]).must_read_primary()
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'client'})}"}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        assert (await client.get("/read", headers=headers)).json() is False
+        response = await client.post("/write", headers=headers)
+        assert "last_write=" in response.headers["set-cookie"]
+        assert "Max-Age=5" in response.headers["set-cookie"]
+        assert (await client.get("/read", headers=headers)).json() is True
+        assert "set-cookie" not in (await client.get("/read", headers=headers)).headers
@@ -0,0 +1,133 @@
+import asyncio
+
+import pytest
+
+from app.infrastructure.dependencies.service_collection import ServiceCollection
+
+
+class Missing:
+    pass
+
+
+class Config:
+    pass
+
+
+class Repository:
+    def __init__(self, config: Config) -> None:
+        self.config = config
+
+
+class Session:
+    pass
+
+
+class UnitOfWork:
+    def __init__(self, session: Session) -> None:
+        self.session = session
+
+
+class Cache:
+    def __init__(self, unit_of_work: UnitOfWork) -> None:
+        self.unit_of_work = unit_of_work
+
+
+class First:
+    def __init__(self, second: "Second") -> None:
+        self.second = second
+
+
+class Second:
+    def __init__(self, first: First) -> None:
+        self.first = first
+
+
+# resolve the forward reference, as the provider reads the raw annotations
+First.__init__.__annotations__["second"] = Second
+
+
+class NeedsMissing:
+    def __init__(self, missing: Missing) -> None:
+        self.missing = missing
+
+
+async def create_config() -> Config:
+    await asyncio.sleep(0)
+    return Config()
+
+
+def test_a_cycle_is_rejected() -> None:
+    services = ServiceCollection()
+    services.add_transient(First, First)
+    services.add_transient(Second, Second)
+    with pytest.raises(Exception, match="Circular dependency detected: First -> Second -> First"):
+        services.build_service_provider()
+
+
+def test_a_missing_registration_is_rejected() -> None:
+    services = ServiceCollection()
+    services.add_transient(NeedsMissing, NeedsMissing)
+    with pytest.raises(Exception, match="depends on .*Missing.*, which is not registered"):
+        services.build_service_provider()
+
+
+@pytest.mark.parametrize("unit_of_work_lifetime", ["scoped", "transient"])
+def test_a_singleton_depending_on_a_scoped_service_is_rejected(unit_of_work_lifetime: str) -> None:
+    services = ServiceCollection()
+    services.add_scoped(Session, Session)
+    getattr(services, f"add_{unit_of_work_lifetime}")(UnitOfWork, UnitOfWork)
+    services.add_singleton(Cache, Cache)
+    with pytest.raises(Exception, match="Singleton service .*Cache.* cannot depend on .*UnitOfWork"):
+        services.build_service_provider()
+
+
+async def test_sync_services_resolve_without_awaiting() -> None:
+    config = Config()
+    services = ServiceCollection()
+    services.add_singleton(Config, config)
+    services.add_transient(Repository, Repository)
+    provider = services.build_service_provider()
+
+    assert not provider.is_async(Repository)
+    repository = provider.get_service_sync(Repository)
+    assert repository.config is config
+    assert repository is not provider.get_service_sync(Repository)
+    assert (await provider.get_service(Repository)).config is config
+
+
+async def test_an_async_factory_makes_its_dependents_async() -> None:
+    services = ServiceCollection()
+    services.add_singleton(Config, create_config)
+    services.add_transient(Repository, Repository)
+    provider = services.build_service_provider()
+
+    assert provider.is_async(Config) and provider.is_async(Repository)
+    with pytest.raises(Exception, match="has an async factory in its dependency graph"):
+        provider.get_service_sync(Repository)
+
+    repository = await provider.get_service(Repository)
+    assert isinstance(repository.config, Config)
+    assert repository.config is await provider.get_service(Config)
+    assert await provider.initialize_singletons() == 0
+
+
+async def test_concurrent_tasks_get_their_own_scope() -> None:
+    services = ServiceCollection()
+    services.add_scoped(Session, Session)
+    services.add_transient(UnitOfWork, UnitOfWork)
+    provider = services.build_service_provider()
+
+    async def handle_request() -> Session:
+        async with provider.create_scope():
+            session = await provider.get_service(Session)
+            await asyncio.sleep(0.01)
+            # the other tasks have opened their scopes in the meantime
+            assert await provider.get_service(Session) is session
+            assert (await provider.get_service(UnitOfWork)).session is session
+            return session
+
+    sessions = await asyncio.gather(*(handle_request() for _ in range(5)))
+
+    assert len({id(session) for session in sessions}) == 5
+    with pytest.raises(Exception, match="No active scope found"):
+        await provider.get_service(Session)
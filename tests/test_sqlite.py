@@ -0,0 +1,67 @@
+from collections.abc import AsyncIterator
+from pathlib import Path
+from typing import Any
+
+import pytest
+from sqlalchemy import event, exc, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.infrastructure.db.db_context_factory import DbContextFactory
+from app.infrastructure.db.engine import PoolOptions
+from app.infrastructure.db.sqlite import SqliteOptions, create_sqlite_engines
+from app.infrastructure.models import Base
+
+
+@pytest.fixture
+async def engines(tmp_path: Path) -> AsyncIterator[tuple[AsyncEngine, AsyncEngine]]:
+    database_url = f"sqlite+aiosqlite:///{tmp_path / 'profile.db'}"
+    writer, reader = create_sqlite_engines(database_url, PoolOptions.for_url(database_url), SqliteOptions())
+    async with writer.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    yield writer, reader
+    await writer.dispose()
+    await reader.dispose()
+
+
+def record_statements(engine: AsyncEngine) -> list[str]:
+    statements: list[str] = []
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _record(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+        statements.append(statement)
+
+    return statements
+
+
+async def test_write_contexts_begin_immediate(engines: tuple[AsyncEngine, AsyncEngine]) -> None:
+    writer, reader = engines
+    statements = record_statements(writer)
+
+    async with DbContextFactory(writer, read_engine=reader).create_db_context() as db_context:
+        await db_context.session.execute(text("SELECT count(*) FROM users"))
+
+    assert statements[:2] == ["BEGIN IMMEDIATE", "SELECT count(*) FROM users"]
+
+
+async def test_autocommit_contexts_skip_begin_immediate(engines: tuple[AsyncEngine, AsyncEngine]) -> None:
+    writer, reader = engines
+    statements = record_statements(writer)
+
+    async with DbContextFactory(writer, read_engine=reader).create_db_context(autocommit=True) as db_context:
+        await db_context.session.execute(text("SELECT count(*) FROM users"))
+
+    assert statements == ["SELECT count(*) FROM users"]
+
+
+async def test_the_reader_pool_rejects_writes(engines: tuple[AsyncEngine, AsyncEngine]) -> None:
+    writer, reader = engines
+
+    with pytest.raises(exc.OperationalError, match="readonly database"):
+        async with DbContextFactory(writer, read_engine=reader).create_db_context(read_only=True) as db_context:
+            await db_context.session.execute(
+                text("INSERT INTO users (username, email, hashed_password) VALUES ('new', 'new@example.com', 'x')")
+            )
+
+    async with reader.connect() as connection:
+        assert (await connection.execute(text("PRAGMA query_only"))).scalar() == 1
+        assert (await connection.execute(text("PRAGMA journal_mode"))).scalar() == "wal"
@@ -0,0 +1,154 @@
+from collections.abc import AsyncIterator
+
+import httpx
+import pytest
+from sqlalchemy import event, insert
+
+from app.infrastructure.db.db_context_factory import DbContextFactory
+from app.infrastructure.models import Base, UserEntity
+from app.presentation.di import get_container
+from app.presentation.main import app
+from app.presentation.middlewares.permissions import create_access_token
+
+HEADERS = {"Authorization": f"Bearer {create_access_token({'sub': 'tester', 'permissions': ['user:read']})}"}
+
+
+@pytest.fixture
+async def client() -> AsyncIterator[httpx.AsyncClient]:
+    engine = get_container().engine
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+        await connection.execute(
+            insert(UserEntity),
+            [{"username": f"user{i}", "email": f"user{i}@example.com", "hashed_password": "x"} for i in range(1, 5)],
+        )
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+
+
+@pytest.fixture
+def db_context_factory() -> DbContextFactory:
+    return get_container().db_context_factory
+
+
+@pytest.fixture
+def statements() -> list[str]:
+    executed: list[str] = []
+    engine = get_container().engine.sync_engine
+
+    def record(connection, cursor, statement, parameters, context, executemany) -> None:
+        executed.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(engine, "before_cursor_execute", record)
+
+
+async def get(client: httpx.AsyncClient, url: str, if_none_match: str | None = None) -> httpx.Response:
+    headers = HEADERS if if_none_match is None else {**HEADERS, "If-None-Match": if_none_match}
+    return await client.get(url, headers=headers)
+
+
+async def test_a_user_is_sent_with_an_etag(client: httpx.AsyncClient) -> None:
+    response = await get(client, "/api/users/1")
+
+    assert response.status_code == 200
+    assert response.json()["username"] == "user1"
+    assert response.headers["ETag"].startswith('"')
+    assert response.headers["Cache-Control"] == "private, no-cache"
+
+
+@pytest.mark.parametrize("if_none_match", ["{etag}", "W/{etag}", "*", '"other", {etag}'])
+async def test_a_matching_if_none_match_is_answered_from_the_version(
+    client: httpx.AsyncClient, statements: list[str], if_none_match: str
+) -> None:
+    etag = (await get(client, "/api/users/1")).headers["ETag"]
+    statements.clear()
+
+    response = await get(client, "/api/users/1", if_none_match.format(etag=etag))
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+    assert len(statements) == 1 and "username" not in statements[0]
+
+
+async def test_a_stale_etag_gets_the_user(client: httpx.AsyncClient) -> None:
+    response = await get(client, "/api/users/1", '"stale"')
+    assert response.status_code == 200
+    assert response.json()["id"] == 1
+
+
+async def test_a_missing_user_is_not_found_despite_if_none_match(client: httpx.AsyncClient) -> None:
+    assert (await get(client, "/api/users/99", "*")).status_code == 404
+
+
+async def test_an_update_changes_the_user_etag(client: httpx.AsyncClient, db_context_factory: DbContextFactory) -> None:
+    etag = (await get(client, "/api/users/1")).headers["ETag"]
+
+    async with db_context_factory.create_db_context() as db_context:
+        user = await db_context.users.try_get(1)
+        user.email = "changed@example.com"
+        await db_context.save()
+
+    response = await get(client, "/api/users/1", etag)
+    assert response.status_code == 200
+    assert response.json()["email"] == "changed@example.com"
+    assert response.headers["ETag"] != etag
+    assert (await get(client, "/api/users/1", response.headers["ETag"])).status_code == 304
+
+
+async def test_a_matching_page_is_answered_from_its_version(
+    client: httpx.AsyncClient, statements: list[str]
+) -> None:
+    response = await get(client, "/api/users?limit=2")
+    assert [user["id"] for user in response.json()] == [1, 2]
+    etag = response.headers["ETag"]
+    statements.clear()
+
+    for if_none_match in (etag, f"W/{etag}", "*", f'"other", {etag}'):
+        response = await get(client, "/api/users?limit=2", if_none_match)
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etag
+    assert all("username" not in statement for statement in statements)
+
+
+async def test_changes_to_a_page_change_its_etag(
+    client: httpx.AsyncClient, db_context_factory: DbContextFactory
+) -> None:
+    etag = (await get(client, "/api/users?limit=2")).headers["ETag"]
+
+    # user 4 is outside the page and the row after it, so the page stays the same
+    async with db_context_factory.create_db_context() as db_context:
+        await db_context.users.update_where(UserEntity.id == 4, values={"is_active": False})
+        await db_context.save()
+    assert (await get(client, "/api/users?limit=2", etag)).status_code == 304
+
+    async with db_context_factory.create_db_context() as db_context:
+        await db_context.users.update_where(UserEntity.id == 2, values={"is_active": False})
+        await db_context.save()
+    response = await get(client, "/api/users?limit=2", etag)
+    assert response.status_code == 200
+    assert response.json()[1]["is_active"] is False
+    etag = response.headers["ETag"]
+
+    # deleting the row after the page changes whether there is a next page
+    async with db_context_factory.create_db_context() as db_context:
+        await db_context.users.delete_where(UserEntity.id == 3)
+        await db_context.save()
+    response = await get(client, "/api/users?limit=2", etag)
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+async def test_the_id_of_a_deleted_last_user_is_not_reused(
+    client: httpx.AsyncClient, db_context_factory: DbContextFactory
+) -> None:
+    async with db_context_factory.create_db_context() as db_context:
+        await db_context.users.delete_where(UserEntity.id == 4)
+        user = await db_context.users.add(UserEntity("user5", "user5@example.com", hashed_password="x"))
+        await db_context.save()
+    assert (user.id, user.version) == (5, 1)
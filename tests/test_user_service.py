@@ -0,0 +1,34 @@
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app.infrastructure.db.db_context_factory import DbContextFactory
+from app.infrastructure.models import UserEntity
+from app.infrastructure.services.user_service import UserAlreadyExistsError, UserService
+
+
+async def create_user(db_context_factory: DbContextFactory, username: str, email: str | None):
+    async with db_context_factory.create_db_context() as db_context:
+        return await UserService().create_user(UserEntity(username, email, hashed_password="x"), db_context)
+
+
+async def test_create_user_returns_the_generated_columns(db_context_factory: DbContextFactory) -> None:
+    user = await create_user(db_context_factory, "new", "new@example.com")
+    assert (user.id, user.username, user.is_active, user.is_superuser) == (4, "new", True, False)
+
+
+@pytest.mark.parametrize(
+    ("username", "email", "detail"),
+    [("user1", "other@example.com", "Username already exists"), ("other", "user1@example.com", "Email already exists")],
+)
+async def test_create_user_reports_unique_violations(
+    db_context_factory: DbContextFactory, username: str, email: str, detail: str
+) -> None:
+    with pytest.raises(UserAlreadyExistsError, match=detail):
+        await create_user(db_context_factory, username, email)
+
+
+async def test_create_user_does_not_report_other_integrity_errors_as_conflicts(
+    db_context_factory: DbContextFactory,
+) -> None:
+    with pytest.raises(IntegrityError, match="NOT NULL constraint failed: users.email"):
+        await create_user(db_context_factory, "other", None)